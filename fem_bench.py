@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#        Измерение производительности на сетках из каталога mesh
+###################################################################
+#
+# Запуск:
+#   python fem_bench.py run [-o bench.json] [-r 3] [-m beam cube ...] [-p static dynamic]
+#   python fem_bench.py run -m -g fe_3d_8:1e5 fe_3d_8:1e6 -p static   (только синтетические сетки)
+#   python fem_bench.py compare baseline.json bench.json [-t 0.1]
+#   python fem_bench.py startup [-b 1.0]   (время импорта fem_object без визуализации)
+#
+# Каждый расчет выполняется в отдельном, заново запущенном (spawn) процессе, время выполнения фаз расчета берется
+# из fem_timer. Пиковая память расчета (peak_memory) - прирост ru_maxrss этого процесса за время расчета сверх
+# объема, занятого после загрузки модулей (base_memory)
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import traceback
+from multiprocessing import get_context
+from time import perf_counter
+import numpy as np
+import scipy
+from fem_defs import DIR_X, DIR_Y, DIR_Z
+from fem_generator import generate_mesh, divisions
+from fem_object import TObject
+from fem_timer import timer
+from fem_progress import TProgress, peak_rss
+
+# Каталог с сетками
+MeshDir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mesh')
+
+# Типы задач
+ProblemType = ['static', 'dynamic']
+
+# Направления закрепления в зависимости от кол-ва степеней свободы
+FixDirect = {1: DIR_X, 2: DIR_X | DIR_Y, 3: DIR_X | DIR_Y | DIR_Z}
+
+
+# Постановка задачи по габаритам сетки: закрепление по минимальной координате вдоль наибольшего
+# размера объекта и объемная нагрузка поперек него (для одномерной задачи - вдоль)
+def setup_case(obj, mesh, problem_type):
+    xyz = mesh.coord_array()[:, 0:max(mesh.freedom, 1)]
+    size = xyz.max(axis=0) - xyz.min(axis=0)
+    axis = int(np.argmax(size))
+    names = ['x', 'y', 'z']
+    obj.set_problem_type(problem_type)
+    obj.set_solve_method('direct')
+    obj.set_elasticity([6.5E+10], [0.3])
+    obj.add_boundary_condition('0', '%s <= %.10E' % (names[axis], xyz[:, axis].min() + 1.0E-6*size[axis]),
+                               FixDirect[mesh.freedom])
+    direct = DIR_X if mesh.freedom == 1 else DIR_Y if axis != 1 else DIR_X
+    if problem_type == 'static':
+        obj.add_volume_load('-1.0E+5', '', direct)
+    else:
+        obj.set_density(1.0E+3)
+        obj.set_damping(1.0E-2)
+        obj.set_time(0, 1.0, 0.25)
+        obj.add_volume_load('-1.0E+5*cos(t)', '', direct)
+
+
+# Выполнение одного расчета (в отдельном процессе)
+def run_case(mesh_file, problem_type):
+    timer.reset()
+    res = {'mesh': os.path.basename(mesh_file), 'problem_type': problem_type, 'base_memory': peak_rss()}
+    start = perf_counter()
+    try:
+        with open(os.devnull, 'w') as null, contextlib.redirect_stdout(null):
+            obj = TObject()
+            obj.set_progress(TProgress([]))
+            if not obj.set_mesh(mesh_file):
+                raise RuntimeError('incorrect mesh')
+            mesh = obj.__mesh__
+            res.update({'nodes': len(mesh.x), 'fe': len(mesh.fe), 'fe_type': mesh.fe_type})
+            setup_case(obj, mesh, problem_type)
+            if not obj.calc():
+                raise RuntimeError('calculation failed')
+            with tempfile.TemporaryDirectory() as tmp:
+                obj.print_result(os.path.join(tmp, 'result.res'))
+        res['status'] = 'ok'
+    except Exception as err:
+        res['status'] = 'error'
+        res['error'] = ''.join(traceback.format_exception_only(type(err), err)).strip()
+    res['total'] = perf_counter() - start
+    res['phases'] = dict((name, value['time']) for name, value in timer.report().items())
+    peak = peak_rss()
+    res['peak_memory'] = peak - res['base_memory'] if peak is not None else None
+    return res
+
+
+# Выполнение расчета в новом процессе (spawn: процесс не наследует память запускающего)
+def run_isolated(mesh_file, problem_type):
+    with get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(run_case, (mesh_file, problem_type))
+
+
+# Лучшее (минимальное) время из нескольких повторов
+def best_of(runs):
+    res = runs[0]
+    for r in runs[1:]:
+        res['total'] = min(res['total'], r['total'])
+        for name, value in r['phases'].items():
+            res['phases'][name] = min(res['phases'].get(name, value), value)
+        if r['peak_memory'] is not None:
+            res['peak_memory'] = max(res['peak_memory'], r['peak_memory'])
+    res['repeat'] = len(runs)
+    return res
+
+
+# Построение синтетических сеток по описаниям вида 'тип_КЭ:кол-во_степеней_свободы' (например, fe_3d_8:1e6)
+def generate(specs, path):
+    meshes = []
+    for spec in specs:
+        fe_type, dofs = spec.split(':')
+        name = os.path.join(path, 'gen_%s_%d.trpa' % (fe_type, int(float(dofs))))
+        if not os.path.exists(name):
+            generate_mesh(fe_type, divisions(fe_type, float(dofs))).save(name)
+        meshes.append(name)
+    return meshes
+
+
+# Выполнение всех расчетов
+def run(args):
+    meshes = sorted(glob.glob(os.path.join(MeshDir, '*.trpa')))
+    if args.mesh is not None:
+        meshes = [m for m in meshes if os.path.splitext(os.path.basename(m))[0] in args.mesh]
+    with tempfile.TemporaryDirectory() as tmp:
+        return run_cases(args, meshes + generate(args.generate, args.mesh_dir or tmp))
+
+
+# Выполнение расчетов на заданных сетках
+def run_cases(args, meshes):
+    cases = {}
+    for mesh_file in meshes:
+        for problem_type in args.problem:
+            name = '%s/%s' % (os.path.splitext(os.path.basename(mesh_file))[0], problem_type)
+            res = best_of([run_isolated(mesh_file, problem_type) for _ in range(0, args.repeat)])
+            cases[name] = res
+            print('%-24s %-6s %9.3f s %10s Kb' %
+                  (name, res['status'], res['total'], res['peak_memory'] if res['peak_memory'] is not None else '-'))
+    report = {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'memory': 'peak_memory: ru_maxrss growth of a spawned worker during the case over base_memory (Kb)',
+        'cases': cases
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+    return 0
+
+
+# Сравнение с базовыми результатами: замедление больше чем в (1 + threshold) раз (и не менее чем на min_time)
+# или рост пиковой памяти больше чем в (1 + threshold) раз считается регрессией
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = json.load(file)['cases']
+    with open(args.current) as file:
+        current = json.load(file)['cases']
+    regressions = 0
+    for name in sorted(set(baseline) & set(current)):
+        base, cur = baseline[name], current[name]
+        if base['status'] != 'ok' or cur['status'] != 'ok':
+            if base['status'] == 'ok':
+                print('%-24s %-12s failed: %s' % (name, '', cur.get('error', '')))
+                regressions += 1
+            continue
+        values = [(phase, base['phases'].get(phase), cur['phases'].get(phase)) for phase in cur['phases']]
+        values.append(('total', base['total'], cur['total']))
+        for phase, old, new in values:
+            if old is None:
+                continue
+            slower = new > old*(1.0 + args.threshold) and new - old >= args.min_time
+            if slower:
+                regressions += 1
+            if slower or args.verbose:
+                print('%-24s %-12s %9.3f -> %9.3f s (%+.1f%%)%s' % (name, phase, old, new, 100.0*(new/old - 1.0)
+                                                                  if old > 0 else 0.0, ' REGRESSION' if slower else ''))
+        if base['peak_memory'] and cur['peak_memory'] and \
+                cur['peak_memory'] > base['peak_memory']*(1.0 + args.threshold):
+            regressions += 1
+            print('%-24s %-12s %9d -> %9d Kb REGRESSION' % (name, 'memory', base['peak_memory'], cur['peak_memory']))
+    for name in sorted(set(baseline) - set(current)):
+        print('%-24s missing in %s' % (name, args.current))
+    print('%d regression(s)' % regressions)
+    return 1 if regressions else 0
+
+
+# Допустимое время импорта fem_object (с)
+StartupBudget = 1.0
+
+# Время импорта модуля fem_object в новом процессе и загруженные при этом модули визуализации
+StartupScript = '''
+import json, sys, time
+start = time.perf_counter()
+import fem_object
+print(json.dumps([time.perf_counter() - start, sorted(m for m in sys.modules if m.split('.')[0] == 'matplotlib')]))
+'''
+
+
+# Импорт fem_object в новом процессе: лучшее время из repeat запусков и модули matplotlib, загруженные при импорте
+def startup_time(repeat=3):
+    path = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    modules = []
+    for _ in range(0, repeat):
+        out = subprocess.check_output([sys.executable, '-c', StartupScript], cwd=path)
+        elapsed, modules = json.loads(out.decode().splitlines()[-1])
+        times.append(elapsed)
+    return min(times), modules
+
+
+# Проверка времени запуска: импорт fem_object не должен загружать matplotlib и должен укладываться в budget (с)
+def startup(args):
+    elapsed, modules = startup_time(args.repeat)
+    print('import fem_object: %.3f s (budget %.3f s)' % (elapsed, args.budget))
+    if len(modules):
+        print('matplotlib loaded at import: %s' % ', '.join(modules))
+    return 1 if elapsed > args.budget or len(modules) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FEM benchmark')
+    commands = parser.add_subparsers(dest='command')
+    p = commands.add_parser('run', help='run benchmark cases')
+    p.add_argument('-o', '--output', default='bench.json', help='JSON report file')
+    p.add_argument('-r', '--repeat', type=int, default=1, help='number of runs of each case (best is taken)')
+    p.add_argument('-m', '--mesh', nargs='*', help='mesh names (default: all meshes in mesh/, none if empty)')
+    p.add_argument('-g', '--generate', nargs='*', default=[], help='synthetic meshes as fe_type:dofs')
+    p.add_argument('--mesh-dir', help='directory to keep synthetic meshes (default: temporary)')
+    p.add_argument('-p', '--problem', nargs='*', default=ProblemType, choices=ProblemType, help='problem types')
+    p = commands.add_parser('compare', help='compare report with baseline')
+    p.add_argument('baseline', help='baseline JSON report')
+    p.add_argument('current', help='current JSON report')
+    p.add_argument('-t', '--threshold', type=float, default=0.1, help='allowed relative slowdown')
+    p.add_argument('--min-time', type=float, default=0.01, help='ignore slowdowns shorter than this (s)')
+    p.add_argument('-v', '--verbose', action='store_true', help='print all phases')
+    p = commands.add_parser('startup', help='check import time of the solver API')
+    p.add_argument('-b', '--budget', type=float, default=StartupBudget, help='allowed import time (s)')
+    p.add_argument('-r', '--repeat', type=int, default=3, help='number of runs (best is taken)')
+    args = parser.parse_args()
+    if args.command == 'run':
+        return run(args)
+    if args.command == 'compare':
+        return compare(args)
+    if args.command == 'startup':
+        return startup(args)
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#         Дисковый кэш глобальных матриц (по содержимому задачи)
+###################################################################
+
+import glob
+import hashlib
+import os
+import numpy as np
+from zipfile import BadZipFile
+from scipy.sparse import coo_matrix
+
+# Расширение файлов кэша
+CacheExt = '.npz'
+
+
+# Массивы для сохранения разреженной матрицы (с префиксом имен prefix, формат матрицы сохраняется)
+def matrix_arrays(matrix, prefix=''):
+    matrix_coo = matrix.tocoo()
+    return {prefix + 'row': matrix_coo.row, prefix + 'col': matrix_coo.col, prefix + 'data': matrix_coo.data,
+            prefix + 'shape': matrix_coo.shape, prefix + 'format': matrix.format}
+
+
+# Разреженная матрица из сохраненных массивов (по умолчанию - в формате lil)
+def arrays_matrix(arrays, prefix=''):
+    fmt = str(arrays[prefix + 'format']) if prefix + 'format' in arrays else 'lil'
+    return coo_matrix((arrays[prefix + 'data'], (arrays[prefix + 'row'], arrays[prefix + 'col'])),
+                      shape=tuple(arrays[prefix + 'shape'])).asformat(fmt)
+
+
+# Ключ глобальных матриц: хэш сетки, типа КЭ, упругих свойств, плотности и демпфирования (extra - дополнительные
+# значения, от которых зависят матрицы, например, тип задачи или шаг по времени)
+def matrix_key(mesh, params, *extra):
+    key = hashlib.sha1()
+    key.update(np.ascontiguousarray(mesh.coord_array()).tobytes())
+    key.update(np.ascontiguousarray(mesh.fe_array(), dtype=np.int64).tobytes())
+    key.update(repr((mesh.fe_type, mesh.freedom, list(params.e), list(params.m), params.density, params.damping) +
+                    extra).encode())
+    return key.hexdigest()
+
+
+# Контрольная сумма сохраняемых массивов
+def checksum(arrays):
+    res = hashlib.sha1()
+    for name in sorted(arrays):
+        res.update(name.encode())
+        res.update(np.ascontiguousarray(arrays[name]).tobytes())
+    return res.hexdigest()
+
+
+# Кэш глобальных матриц в каталоге path: по файлу на ключ, при превышении объема size (байт) удаляются
+# наиболее давно использованные файлы. Поврежденные файлы (не совпадает контрольная сумма) удаляются
+class TMatrixCache:
+    def __init__(self, path, size=1024*1024*1024):
+        self.path = path        # Каталог кэша
+        self.size = size        # Предельный объем кэша (байт)
+
+    # Загрузка матриц (имя -> матрица) по ключу, None - если их нет в кэше
+    def get(self, key, names):
+        name = self.__file_name__(key)
+        if not os.path.exists(name):
+            return None
+        try:
+            with np.load(name) as file:
+                arrays = dict((k, file[k]) for k in file.files)
+            if 'checksum' not in arrays or str(arrays.pop('checksum')) != checksum(arrays):
+                raise ValueError('cache entry is damaged')
+            res = dict((n, arrays_matrix(arrays, n + '_')) for n in names)
+        except (IOError, ValueError, KeyError, BadZipFile):
+            self.__remove__(name)
+            return None
+        # Отметка использования (для вытеснения)
+        os.utime(name)
+        return res
+
+    # Сохранение матриц (имя -> матрица) по ключу; ошибки записи не прерывают расчет
+    def put(self, key, matrices):
+        arrays = {}
+        for n, matrix in matrices.items():
+            arrays.update(matrix_arrays(matrix, n + '_'))
+        arrays['checksum'] = checksum(arrays)
+        name = self.__file_name__(key)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(name + '.tmp', 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(name + '.tmp', name)
+        except IOError:
+            self.__remove__(name + '.tmp')
+            return False
+        self.evict()
+        return True
+
+    # Удаление наиболее давно использованных файлов сверх предельного объема
+    def evict(self):
+        files = []
+        for name in glob.glob(os.path.join(self.path, '*' + CacheExt)):
+            try:
+                stat = os.stat(name)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(f[1] for f in files)
+        for _, size, name in sorted(files):
+            if total <= self.size:
+                break
+            self.__remove__(name)
+            total -= size
+
+    # Очистка кэша
+    def clear(self):
+        for name in glob.glob(os.path.join(self.path, '*' + CacheExt)):
+            self.__remove__(name)
+
+    def __file_name__(self, key):
+        return os.path.join(self.path, key + CacheExt)
+
+    @staticmethod
+    def __remove__(name):
+        try:
+            os.remove(name)
+        except OSError:
+            pass
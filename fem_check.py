@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#              Проверка корректности и качества сетки
+###################################################################
+
+import numpy as np
+from fem_defs import eps
+
+# Ребра КЭ в локальной нумерации его узлов
+FEEdge = {
+    'fe_1d_2': [[0, 1]],
+    'fe_2d_3': [[0, 1], [1, 2], [2, 0]],
+    'fe_2d_4': [[0, 1], [1, 2], [2, 3], [3, 0]],
+    'fe_3d_4': [[0, 1], [1, 2], [2, 0], [0, 3], [1, 3], [2, 3]],
+    'fe_3d_8': [[0, 1], [1, 2], [2, 3], [3, 0], [4, 5], [5, 6], [6, 7], [7, 4], [0, 4], [1, 5], [2, 6], [3, 7]]
+}
+
+# Границы интервалов гистограммы отношения сторон КЭ
+AspectBins = [1.0, 2.0, 3.0, 5.0, 10.0, 100.0, np.inf]
+
+
+# Производные изопараметрических функций форм в вершинах КЭ (вершина x производная x узел)
+def corner_shape_derivatives(fe_type):
+    if fe_type == 'fe_2d_4':
+        ref = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=float)
+    else:
+        ref = np.array([[-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+                        [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1]], dtype=float)
+    dim = ref.shape[1]
+    # N_j = П(1 + ref[j, k]*xi_k)/2^dim, dN_j/dxi_d = ref[j, d]*П_{k != d}(1 + ref[j, k]*xi_k)/2^dim
+    factor = 1.0 + ref[:, np.newaxis, :]*ref[np.newaxis, :, :]     # вершина x узел x координата
+    res = np.zeros((len(ref), dim, len(ref)))
+    for d in range(0, dim):
+        other = np.prod(np.delete(factor, d, axis=2), axis=2)
+        res[:, d, :] = ref[np.newaxis, :, d]*other/2.0**dim
+    return res
+
+
+# Якобианы (ориентированные объемы) КЭ в каждой из вершин (p - координаты вершин всех КЭ: ne x size x 3)
+def corner_jacobians(fe_type, p):
+    if fe_type == 'fe_1d_2':
+        return (p[:, 1, 0] - p[:, 0, 0])[:, np.newaxis]
+    if fe_type == 'fe_2d_3':
+        d1 = p[:, 1] - p[:, 0]
+        d2 = p[:, 2] - p[:, 0]
+        return (d1[:, 0]*d2[:, 1] - d1[:, 1]*d2[:, 0])[:, np.newaxis]
+    if fe_type == 'fe_3d_4':
+        return np.linalg.det(p[:, 1:] - p[:, 0:1])[:, np.newaxis]
+    dim = 2 if fe_type == 'fe_2d_4' else 3
+    # Матрицы Якоби в вершинах: (КЭ x вершина x производная x координата)
+    jacobi = np.einsum('cdn,enk->ecdk', corner_shape_derivatives(fe_type), p[:, :, 0:dim])
+    return np.linalg.det(jacobi)
+
+
+# Результаты проверки сетки
+class TMeshCheck:
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.jacobian = []          # Минимальный (по вершинам) якобиан каждого КЭ
+        self.aspect = []            # Отношение наибольшего ребра КЭ к наименьшему
+        self.degenerate = []        # Вырожденные КЭ (нулевой объем или совпадающие узлы)
+        self.inverted = []          # Вывернутые КЭ (якобиан меняет знак внутри КЭ)
+        self.bad_index = []         # КЭ со ссылками на несуществующие узлы
+        self.duplicate_nodes = []   # Пары совпадающих по координатам узлов
+        self.histogram = []         # Гистограмма отношения сторон (по интервалам AspectBins)
+
+    # Выполнение всех проверок
+    def run(self):
+        fe = self.mesh.fe_array()
+        n = len(self.mesh.x)
+        self.bad_index = np.flatnonzero(np.any((fe < 0) | (fe >= n), axis=1))
+        if len(self.bad_index):
+            return self.is_valid()
+        xyz = self.mesh.coord_array()
+        p = xyz[fe]
+        # Характерный размер КЭ и отношение сторон
+        edges = np.array(FEEdge[self.mesh.fe_type])
+        length = np.linalg.norm(p[:, edges[:, 1]] - p[:, edges[:, 0]], axis=2)
+        size = length.mean(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.aspect = length.max(axis=1)/length.min(axis=1)
+        self.histogram = np.histogram(self.aspect[np.isfinite(self.aspect)], bins=AspectBins)[0]
+        # Якобианы в вершинах КЭ
+        jacobian = corner_jacobians(self.mesh.fe_type, p)
+        self.jacobian = np.where(np.all(jacobian < 0, axis=1), jacobian.max(axis=1), jacobian.min(axis=1))
+        dim = 1 if self.mesh.fe_type == 'fe_1d_2' else 2 if self.mesh.fe_type in ('fe_2d_3', 'fe_2d_4') else 3
+        small = np.abs(jacobian) <= eps*size[:, np.newaxis]**dim
+        repeated = np.any(np.sort(fe, axis=1)[:, 1:] == np.sort(fe, axis=1)[:, :-1], axis=1)
+        self.degenerate = np.flatnonzero(np.any(small, axis=1) | repeated)
+        mixed = np.any(jacobian > 0, axis=1) & np.any(jacobian < 0, axis=1)
+        self.inverted = np.setdiff1d(np.flatnonzero(mixed), self.degenerate)
+        self.duplicate_nodes = self.__duplicate_nodes__(xyz)
+        return self.is_valid()
+
+    # Сетка пригодна для расчета
+    def is_valid(self):
+        return not (len(self.bad_index) or len(self.degenerate) or len(self.inverted))
+
+    # Краткий отчет о проверке
+    def report(self, limit=10):
+        lines = []
+        if len(self.aspect):
+            ranges = ['%g-%g: %d' % (AspectBins[i], AspectBins[i + 1], self.histogram[i])
+                      for i in range(0, len(self.histogram)) if self.histogram[i]]
+            lines.append('Aspect ratio: max %g (%s)' % (np.nanmax(self.aspect), ', '.join(ranges)))
+        for name, index in [('bad node index', self.bad_index), ('degenerate', self.degenerate),
+                            ('inverted', self.inverted)]:
+            if len(index):
+                lines.append('FE with %s (%d): %s' % (name, len(index), self.__list__(index, limit)))
+        if len(self.duplicate_nodes):
+            lines.append('Coincident nodes (%d): %s' %
+                         (len(self.duplicate_nodes),
+                          self.__list__(['%d=%d' % (i, j) for i, j in self.duplicate_nodes], limit)))
+        return lines
+
+    # Поиск узлов с совпадающими координатами
+    @staticmethod
+    def __duplicate_nodes__(xyz):
+        if not len(xyz):
+            return []
+        scale = max(np.abs(xyz).max(), 1.0)
+        key = np.round(xyz/(scale*eps*1.0E+3)).astype(np.int64)
+        order = np.lexsort(key.T[::-1])
+        same = np.flatnonzero(np.all(key[order][1:] == key[order][:-1], axis=1))
+        return [(int(order[i]), int(order[i + 1])) for i in same]
+
+    @staticmethod
+    def __list__(values, limit):
+        text = ', '.join(str(v) for v in list(values)[0:limit])
+        return text + (', ...' if len(values) > limit else '')
@@ -5,26 +5,25 @@
 #######################################################################
 
 import math
-from scipy.sparse import lil_matrix, coo_matrix
-from numpy import zeros, savez, load
+import os
+from zipfile import BadZipFile
+from scipy.sparse import lil_matrix
+from numpy import zeros, savez, load, array
 from fem_defs import INIT_U, INIT_V, INIT_W, INIT_U_T, INIT_V_T, INIT_W_T, INIT_U_T_T, INIT_V_T_T, INIT_W_T_T
+from fem_error import TFEMException
+from fem_cache import matrix_arrays, arrays_matrix, matrix_key
 from fem_static import TFEMStatic
+from fem_timer import timer
 
 
 # Сохранение разреженной матрицы в файл
 def save_matrix(file_name, matrix):
-    matrix_coo = matrix.tocoo()
-    row = matrix_coo.row
-    col = matrix_coo.col
-    data = matrix_coo.data
-    shape = matrix_coo.shape
-    savez(file_name, row=row, col=col, data=data, shape=shape)
+    savez(file_name, **matrix_arrays(matrix))
 
 
 # Загрузка разреженной матрицы из файла
 def load_matrix(file_name):
-    matrix = load(file_name)
-    return coo_matrix((matrix['data'], (matrix['row'], matrix['col'])), shape=matrix['shape']).tolil()
+    return arrays_matrix(load(file_name))
 
 
 class TFEMDynamic(TFEMStatic):
@@ -35,54 +34,124 @@ class TFEMDynamic(TFEMStatic):
 
     # Расчет динамической задачи методом конечных элементов
     def __calc_problem__(self):
-        size = len(self.__mesh__.x)*self.__mesh__.freedom
-        self.__global_matrix_stiffness__ = lil_matrix((size, size))
-        self.__global_matrix_mass__ = lil_matrix((size, size))
-        self.__global_matrix_damping__ = lil_matrix((size, size))
-        self.__global_load__ = [0]*size
-        fe = self.__create_fe__()
-        fe.set_elasticity(self.__params__.e, self.__params__.m)
-        fe.set_damping(self.__params__.damping)
-        fe.set_density(self.__params__.density)
-
-        # Создание глобальных матриц жесткости, масс и демпфирования
-        self.__progress__.set_process('Assembling global stiffness, mass and damping matrix...', 1,
-                                      len(self.__mesh__.fe))
-        for i in range(0, len(self.__mesh__.fe)):
-            self.__progress__.set_progress(i + 1)
-            x = [0]*len(self.__mesh__.fe[i])
-            y = [0]*len(self.__mesh__.fe[i])
-            z = [0]*len(self.__mesh__.fe[i])
-            # Настройка КЭ
-            for j in range(len(self.__mesh__.fe[i])):
-                x[j], y[j], z[j] = self.__mesh__.get_coord(self.__mesh__.fe[i][j])
-            fe.set_coord(x, y, z)
-            fe.generate(False)
-            # Ансамблирование ЛМЖ к ГМЖ
-            self.__assembly__(fe, i)
-        # Формирование левой части СЛАУ
-        self.__create_dynamic_matrix__()
-        # Учет начальных условий
-        u0, ut0, utt0 = self.__prepare_initial_condition__()
+        # Продолжение расчета с контрольной точки
+        state = self.__load_checkpoint__() if self.__params__.restart else None
+        if state is None:
+            u0, ut0, utt0 = self.__prepare_problem__()
+            t = self.__params__.t0
+        else:
+            t, u0, ut0, utt0 = state
         # Итерационный процесс по времени
-        t = self.__params__.t0
         while t <= self.__params__.t1:
             print('t = %5.2f' % t)
             # Формирование правой части СЛАУ
-            self.__create_dynamic_vector__(u0, ut0, utt0, t)
+            with timer.phase('load'):
+                self.__create_dynamic_vector__(u0, ut0, utt0, t)
             # Учет краевых условий
-            self.__use_boundary_condition__()
+            with timer.phase('constraints'):
+                self.__use_boundary_condition__()
             # Решение СЛАУ
-            if not self.__solve__():
+            with timer.phase('solve'):
+                ret = self.__solve__()
+            if not ret:
                 print('The system of equations is not solved!')
                 return False
-            u0, ut0, utt0 = self.__calc_dynamic_results__(u0, ut0, utt0, t)
+            with timer.phase('results'):
+                u0, ut0, utt0 = self.__calc_dynamic_results__(u0, ut0, utt0, t)
+            with timer.phase('output'):
+                self.__save_step__(t)
             t += self.__params__.th
             if math.fabs(t - self.__params__.t1) < self.__params__.eps:
                 t = self.__params__.t1
+            # Запись контрольной точки
+            if self.__params__.checkpoint_interval > 0 and \
+                    not len(self.__result__.times) % self.__params__.checkpoint_interval:
+                with timer.phase('output'):
+                    self.__save_checkpoint__(t, u0, ut0, utt0)
         print('**************** Success! ****************')
         return True
 
+    # Формирование глобальных матриц и начальных условий
+    def __prepare_problem__(self):
+        size = len(self.__mesh__.x)*self.__mesh__.freedom
+        self.__global_matrix_stiffness__ = lil_matrix((size, size))
+        self.__global_matrix_mass__ = lil_matrix((size, size))
+        self.__global_matrix_damping__ = lil_matrix((size, size))
+        self.__global_load__ = [0]*size
+        fe = self.__create_fe__()
+        fe.set_elasticity(self.__params__.e, self.__params__.m)
+        fe.set_damping(self.__params__.damping)
+        fe.set_density(self.__params__.density)
+
+        # Создание глобальных матриц жесткости, масс и демпфирования (или их загрузка из кэша)
+        with timer.phase('assembly'):
+            if not self.__load_matrices__():
+                self.__progress__.set_process('Assembling global stiffness, mass and damping matrix...', 1,
+                                              len(self.__mesh__.fe))
+                geometry = self.__get_geometry__(fe)
+                coords = geometry.coords()
+                c = geometry.coefficients()
+                for i in range(0, len(self.__mesh__.fe)):
+                    self.__progress__.set_progress(i + 1)
+                    # Настройка КЭ
+                    x, y, z = coords[i].T.tolist()
+                    fe.set_geometry(c[i], x, y, z)
+                    fe.generate(False)
+                    # Ансамблирование ЛМЖ к ГМЖ
+                    self.__assembly__(fe, i)
+                self.__store_matrices__()
+            # Формирование левой части СЛАУ
+            self.__create_dynamic_matrix__()
+        # Учет начальных условий
+        with timer.phase('load'):
+            return self.__prepare_initial_condition__()
+
+    # Запись контрольной точки: момент времени следующего шага, перемещения, скорости и ускорения, глобальные
+    # матрицы (ГМЖ - с учетом динамической части и краевых условий) и полученные результаты. Файл заменяется
+    # целиком, поэтому прерывание записи не портит предыдущую контрольную точку
+    def __save_checkpoint__(self, t, u0, ut0, utt0):
+        name = self.__params__.checkpoint_file
+        arrays = {'key': self.__checkpoint_key__(), 't': t, 'u0': u0, 'ut0': ut0, 'utt0': utt0,
+                  'times': array(self.__result__.times, dtype=float), 'names': array(self.__result__.names),
+                  'results': self.__result__.array()}
+        arrays.update(matrix_arrays(self.__global_matrix_stiffness__, 'k_'))
+        arrays.update(matrix_arrays(self.__global_matrix_mass__, 'm_'))
+        arrays.update(matrix_arrays(self.__global_matrix_damping__, 'd_'))
+        try:
+            with open(name + '.tmp', 'wb') as file:
+                savez(file, **arrays)
+            os.replace(name + '.tmp', name)
+        except IOError:
+            raise TFEMException('write_file_err')
+
+    # Ключ контрольной точки (матрицы зависят и от шага по времени, продолжение расчета - от краевых условий,
+    # нагрузок и значений переменных)
+    def __checkpoint_key__(self):
+        conditions = [(c.type, c.direct, c.expression, c.predicate) for c in self.__params__.bc_list]
+        return matrix_key(self.__mesh__, self.__params__, self.__params__.th, conditions,
+                          sorted(self.__params__.var_list.items()))
+
+    # Загрузка контрольной точки (None - если ее нет); возвращает момент времени следующего шага, перемещения,
+    # скорости и ускорения
+    def __load_checkpoint__(self):
+        name = self.__params__.checkpoint_file
+        if not os.path.exists(name):
+            return None
+        try:
+            with load(name) as arrays:
+                if str(arrays['key']) != self.__checkpoint_key__() or \
+                        list(arrays['names']) != self.__result_names__():
+                    raise TFEMException('checkpoint_err')
+                self.__global_matrix_stiffness__ = arrays_matrix(arrays, 'k_')
+                self.__global_matrix_mass__ = arrays_matrix(arrays, 'm_')
+                self.__global_matrix_damping__ = arrays_matrix(arrays, 'd_')
+                for t, values in zip(arrays['times'], arrays['results']):
+                    self.__result__.add_step(float(t), self.__result_names__(), values)
+                    self.__save_step__(float(t))
+                return float(arrays['t']), arrays['u0'], arrays['ut0'], arrays['utt0']
+        except (IOError, ValueError, KeyError, BadZipFile):
+            raise TFEMException('checkpoint_err')
+
     # Извлечение начальных условий
     def __prepare_initial_condition__(self):
         u0 = zeros(len(self.__mesh__.x)*self.__mesh__.freedom)
@@ -123,25 +192,27 @@ class TFEMDynamic(TFEMStatic):
                         utt0[j*self.__mesh__.freedom + 2] = value
         return u0, ut0, utt0
 
+    # Глобальные матрицы, сохраняемые в кэше
+    def __cached_matrices__(self):
+        return ['__global_matrix_stiffness__', '__global_matrix_mass__', '__global_matrix_damping__']
+
     # Вычисление напряжений, деформаций, скоростей и ускорений
     def __calc_dynamic_results__(self, u0, ut0, utt0, t):
         # Вычисление деформаций и напряжений
         super().__calc_results__(t)
         # Вычисление скоростей и ускорений (конечными разностями)
         th = self.__params__.th
-        for i in range(0, len(self.__mesh__.x)):
-            for j in range(0, self.__mesh__.freedom):
-                u_0 = u0[i*self.__mesh__.freedom + j]
-                u_1 = self.__global_load__[i*self.__mesh__.freedom + j]
-                u_t_0 = ut0[i*self.__mesh__.freedom + j]
-                u_t_1 = (u_1 - u_0)/th
-                u_t_t_1 = (u_t_1 - u_t_0)/th
-                u0[i*self.__mesh__.freedom + j] = u_1
-                ut0[i*self.__mesh__.freedom + j] = u_t_1
-                utt0[i*self.__mesh__.freedom + j] = u_t_t_1
-                self.__result__[len(self.__result__) - 2*self.__mesh__.freedom + j].results[i] = u_t_1
-                self.__result__[len(self.__result__) - self.__mesh__.freedom + j].results[i] = u_t_t_1
-        return u0, ut0, utt0
+        u1 = array(self.__global_load__, dtype=float)
+        ut1 = (u1 - u0)/th
+        utt1 = (ut1 - ut0)/th
+        freedom = self.__mesh__.freedom
+        num = self.__num_result__()
+        for j in range(0, freedom):
+            for name, values in [(self.__params__.names[self.__index_result__(num - 2*freedom + j)], ut1[j::freedom]),
+                                 (self.__params__.names[self.__index_result__(num - freedom + j)], utt1[j::freedom])]:
+                if name in self.__result__.names:
+                    self.__result__.set(name, t, values)
+        return u1, ut1, utt1
 
     # Добавление ЛМЖ, ЛММ и ЛМД к ГМЖ
     def __assembly__(self, fe, index):
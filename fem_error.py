@@ -33,6 +33,32 @@ class TFEMException(Exception):
             err_msg += 'not specified the parameters of elasticity'
         elif self.error == 'time_err':
             err_msg += 'incorrectly specified time parameters'
+        elif self.error == 'write_file_err':
+            err_msg += 'write file error'
+        elif self.error == 'renumber_method_err':
+            err_msg += 'unknown node renumbering method'
+        elif self.error == 'partition_err':
+            err_msg += 'incorrect number of subdomains'
+        elif self.error == 'fields_err':
+            err_msg += 'unknown result function in the list of requested fields'
+        elif self.error == 'vtk_encoding_err':
+            err_msg += 'unknown VTK data encoding (raw or base64)'
+        elif self.error == 'profile_mode_err':
+            err_msg += 'unknown profiling mode (cpu or memory)'
+        elif self.error == 'render_err':
+            err_msg += 'unable to render the image'
+        elif self.error == 'job_err':
+            err_msg += 'incorrect job description'
+        elif self.error == 'job_mesh_err':
+            err_msg += 'unable to load the mesh of the job'
+        elif self.error == 'job_calc_err':
+            err_msg += 'calculation of the job failed'
+        elif self.error == 'job_output_err':
+            err_msg += 'unable to write the output of the job'
+        elif self.error == 'job_name_err':
+            err_msg += 'job files with the same name share an output directory'
+        elif self.error == 'checkpoint_err':
+            err_msg += 'checkpoint file is damaged or does not match the problem'
         else:
             err_msg += self.error
         print('\033[1;31m%s\033[1;m' % err_msg)
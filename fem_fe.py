@@ -9,12 +9,40 @@ from abc import abstractmethod
 from numpy.linalg import solve, LinAlgError
 from numpy import array
 from numpy import zeros
+from numpy import ones
+from numpy import stack
+from numpy import einsum
 from numpy.linalg import det
 from numpy.linalg import inv
 from fem_error import TFEMException
 from fem_defs import eps
 
 
+# Деформации и напряжения по градиентам перемещений du (КЭ x вершина x компонента x координата)
+def strain_stress(du, e, m):
+    freedom = du.shape[2]
+    if freedom == 1:
+        # Exx, Sxx
+        return stack([du[:, :, 0, 0], e*du[:, :, 0, 0]])
+    if freedom == 2:
+        # Exx, Eyy, Exy, Sxx, Syy, Sxy
+        g = e/(2.0 + 2.0*m)
+        k = e/(1.0 - m**2)
+        exx, eyy = du[:, :, 0, 0], du[:, :, 1, 1]
+        exy = du[:, :, 0, 1] + du[:, :, 1, 0]
+        return stack([exx, eyy, exy, k*(exx + m*eyy), k*(eyy + m*exx), g*exy])
+    # Exx, Eyy, Ezz, Exy, Exz, Eyz, Sxx, Syy, Szz, Sxy, Sxz, Syz
+    g = e/(2.0 + 2.0*m)
+    l = 2.0*m*g/(1.0 - 2.0*m)
+    exx, eyy, ezz = du[:, :, 0, 0], du[:, :, 1, 1], du[:, :, 2, 2]
+    exy = du[:, :, 0, 1] + du[:, :, 1, 0]
+    exz = du[:, :, 0, 2] + du[:, :, 2, 0]
+    eyz = du[:, :, 1, 2] + du[:, :, 2, 1]
+    theta = l*(exx + eyy + ezz)
+    return stack([exx, eyy, ezz, exy, exz, eyz, 2.0*g*exx + theta, 2.0*g*eyy + theta, 2.0*g*ezz + theta,
+                  g*exy, g*exz, g*eyz])
+
+
 # Абстрактный базовый класс, описывающий конечный элемент (КЭ)
 class TFE:
     def __init__(self):
@@ -35,6 +63,15 @@ class TFE:
 
     # Задание координат
     def set_coord(self, *args):
+        self.__set_coord__(*args)
+        self.__create__()
+
+    # Задание координат и заранее вычисленных коэффициентов функций форм
+    def set_geometry(self, c, *args):
+        self.__set_coord__(*args)
+        self.c = c
+
+    def __set_coord__(self, *args):
         if len(args) == 1:
             self.x = args[0]
         elif len(args) == 2:
@@ -44,7 +81,6 @@ class TFE:
             self.x = args[0]
             self.y = args[1]
             self.z = args[2]
-        self.__create__()
 
     # Задание объемной нагрузки
     def set_volume_load(self, *args):
@@ -86,6 +122,39 @@ class TFE:
     def calc(self, u):
         return [[]]
 
+    # Значения базисных функций и их производных в вершинах КЭ (p - координаты вершин всех КЭ: ne x size x 3)
+    @abstractmethod
+    def __basis__(self, p):
+        raise NotImplementedError('Method TFE.__basis__ is pure virtual')
+
+    # Коэффициенты функций форм всех КЭ (КЭ x функция формы x коэффициент, как в self.c)
+    def shape_coefficients(self, p):
+        # Проверка вырожденности КЭ (как в __create__) по определителю матрицы значений базисных функций, вычисленному
+        # в координатах, перенесенных в первую вершину КЭ и отнесенных к его размеру (не зависит от масштаба сетки)
+        q = p - p[:, 0:1, :]
+        scale = abs(q).max(axis=(1, 2))
+        if (scale == 0).any() or (abs(det(self.__basis__(q/scale[:, None, None])[0])) < eps).any():
+            raise TFEMException('incorrect_fe_err')
+        try:
+            # c[j][k] = inv(a)[k][j], где a[i] - значения базисных функций в i-й вершине
+            return inv(self.__basis__(p)[0]).transpose(0, 2, 1)
+        except LinAlgError:
+            raise TFEMException('incorrect_fe_err')
+
+    # Производные функций форм всех КЭ в их вершинах (КЭ x вершина x координата x функция формы)
+    def shape_gradients(self, p, c=None):
+        if c is None:
+            c = self.shape_coefficients(p)
+        return einsum('eidk,ejk->eidj', self.__basis__(p)[1], c)
+
+    # Вычисление стандартных результатов сразу для всех КЭ (u - перемещения вершин: ne x size x freedom)
+    def calc_all(self, p, u, gradients=None):
+        if gradients is None:
+            gradients = self.shape_gradients(p)
+        # du[e][i][l][k] - производная l-й компоненты перемещения по k-й координате в i-й вершине
+        du = einsum('eikj,ejl->eilk', gradients, u)
+        return strain_stress(du, self.e[0], self.m[0])
+
 
 # Линейный (двухузловой) одномерный КЭ
 class TFE1D2(TFE):
@@ -120,6 +189,12 @@ class TFE1D2(TFE):
         self.c[1][0] = self.x[0]/(self.x[0] - self.x[1])
         self.c[1][1] = -1.0/(self.x[0] - self.x[1])
 
+    def __basis__(self, p):
+        x = p[:, :, 0]
+        value = stack([ones(x.shape), x], axis=2)
+        derivative = stack([zeros(x.shape), ones(x.shape)], axis=2)[:, :, None, :]
+        return value, derivative
+
     def calc(self, u):
         res = zeros((2, 2))
         res[0][0] = res[0][1] = u[0]*self.c[0][1] + u[1]*self.c[1][1]
@@ -196,6 +271,15 @@ class TFE2D3(TFE):
             self.c[i][1] = det2/det0
             self.c[i][2] = det3/det0
 
+    def __basis__(self, p):
+        x, y = p[:, :, 0], p[:, :, 1]
+        value = stack([ones(x.shape), x, y], axis=2)
+        derivative = stack([
+            stack([zeros(x.shape), ones(x.shape), zeros(x.shape)], axis=2),
+            stack([zeros(x.shape), zeros(x.shape), ones(x.shape)], axis=2)
+        ], axis=2)
+        return value, derivative
+
     def calc(self, u):
         m = self.m[0]
         g = self.e[0]/(2.0 + 2.0*m)
@@ -275,6 +359,17 @@ class TFE3D4(TFE):
             x = solve(a, b)
             self.c[j] = list(x)
 
+    def __basis__(self, p):
+        x, y, z = p[:, :, 0], p[:, :, 1], p[:, :, 2]
+        o, i = zeros(x.shape), ones(x.shape)
+        value = stack([i, x, y, z], axis=2)
+        derivative = stack([
+            stack([o, i, o, o], axis=2),
+            stack([o, o, i, o], axis=2),
+            stack([o, o, o, i], axis=2)
+        ], axis=2)
+        return value, derivative
+
     def calc(self, u):
         g = self.e[0]/(2.0 + 2.0*self.m[0])
         l = 2.0*self.m[0]*g/(1.0 - 2.0*self.m[0])
@@ -452,6 +547,16 @@ class TFE2D4(TFE):
 #            sys.stdout.write('\n')
 #        print('*******************************')
 
+    def __basis__(self, p):
+        x, y = p[:, :, 0], p[:, :, 1]
+        o, i = zeros(x.shape), ones(x.shape)
+        value = stack([i, x, y, x*y], axis=2)
+        derivative = stack([
+            stack([o, i, o, y], axis=2),
+            stack([o, o, i, x], axis=2)
+        ], axis=2)
+        return value, derivative
+
     def calc(self, u):
         m = self.m[0]
         g = self.e[0]/(2.0 + 2.0*m)
@@ -631,6 +736,17 @@ class TFE3D8(TFE):
 #            sys.stdout.write('\n')
 #        print('******************************************')
 
+    def __basis__(self, p):
+        x, y, z = p[:, :, 0], p[:, :, 1], p[:, :, 2]
+        o, i = zeros(x.shape), ones(x.shape)
+        value = stack([i, x, y, z, x*y, x*z, y*z, x*y*z], axis=2)
+        derivative = stack([
+            stack([o, i, o, o, y, z, o, y*z], axis=2),
+            stack([o, o, i, o, x, o, z, x*z], axis=2),
+            stack([o, o, o, i, o, x, y, x*y], axis=2)
+        ], axis=2)
+        return value, derivative
+
     def calc(self, u):
         g = self.e[0]/(2.0 + 2.0*self.m[0])
         l = 2.0*self.m[0]*g/(1.0 - 2.0*self.m[0])
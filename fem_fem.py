@@ -11,6 +11,10 @@ from fem_progress import TProgress
 from fem_fe import TFE, TFE1D2, TFE2D3, TFE2D4, TFE3D4, TFE3D8
 from fem_parser import TParser
 from fem_error import TFEMException
+from fem_result import TResultStore, derived_depends
+from fem_resfile import TResultWriter
+from fem_profiler import TProfiler
+from fem_timer import timer
 
 
 # Абстрактный базовый класс, реализующий МКЭ
@@ -19,7 +23,8 @@ class TFEM:
         self.__mesh__ = TMesh()                                 # Дискретная модель объекта
         self.__params__ = TFEMParams()                          # Параметры расчета
         self.__progress__ = TProgress()                         # Индикатор прогресса расчета
-        self.__result__ = []                                    # Список результатов расчета
+        self.__result__ = TResultStore()                        # Результаты расчета
+        self.__result_writer__ = None                           # Запись результатов в двоичный файл
 
     @abstractmethod
     def __calc_problem__(self):
@@ -35,6 +40,16 @@ class TFEM:
     def __calc_results__(self):
         raise NotImplementedError('Method TFEM.calc_results is pure virtual')
 
+    # Определение кол-ва результатов в зависимости от размерности задачи
+    @abstractmethod
+    def __num_result__(self):
+        raise NotImplementedError('Method TFEM.__num_result__ is pure virtual')
+
+    # Индекс функции в зависимости от размерности задачи
+    @abstractmethod
+    def __index_result__(self, i):
+        raise NotImplementedError('Method TFEM.__index_result__ is pure virtual')
+
     # Прямое решение СЛАУ
     @abstractmethod
     def __solve_direct__(self):
@@ -69,6 +84,10 @@ class TFEM:
             fe = TFE3D8()
         return fe
 
+    # Геометрические характеристики КЭ сетки (общие для ансамблирования и вычисления результатов)
+    def __get_geometry__(self, fe):
+        return self.__mesh__.geometry(fe, self.__params__.cache_size*1024*1024)
+
     # Настройка парсера
     def __create_parser__(self):
         parser = TParser()
@@ -83,19 +102,90 @@ class TFEM:
         try:
             # Проверка наличия и соответствия необходимых параметров расчета
             self.__params__.check_params()
+            self.__selected_results__()
+            self.__start_profiler__()
+            self.__open_result_file__()
             ret = self.__calc_problem__()
         except TFEMException as err:
             ret = False
             err.print_error()
+        finally:
+            self.__progress__.stop()
+            if self.__result_writer__ is not None:
+                self.__result_writer__.close()
+                self.__result_writer__ = None
+            self.__stop_profiler__()
         return ret
 
+    # Включение профилирования фаз расчета (если задан каталог для его результатов)
+    def __start_profiler__(self):
+        if not len(self.__params__.profile_dir):
+            return
+        timer.profiler = TProfiler(self.__params__.profile_dir, self.__params__.profile_mode)
+        timer.profiler.start()
+
+    # Отключение профилирования и запись его результатов
+    def __stop_profiler__(self):
+        if timer.profiler is None:
+            return
+        profiler, timer.profiler = timer.profiler, None
+        try:
+            profiler.stop()
+        except TFEMException as err:
+            err.print_error()
+
+    # Открытие двоичного файла результатов (если задан)
+    def __open_result_file__(self):
+        if not len(self.__params__.result_file):
+            return
+        header = {
+            'mesh': self.__mesh__.mesh_file,
+            'fe_type': self.__mesh__.fe_type,
+            'problem_type': self.__params__.problem_type,
+            'nodes': len(self.__mesh__.x),
+            'names': self.__result_names__(),
+            'dtype': self.__result__.dtype.str
+        }
+        self.__result_writer__ = TResultWriter(self.__params__.result_file, header)
+        try:
+            self.__result_writer__.open()
+        except IOError:
+            self.__result_writer__ = None
+            raise TFEMException('write_file_err')
+
+    # Номера (в порядке __index_result__) функций, которые нужно вычислить для получения запрошенных
+    def __selected_results__(self):
+        names = [self.__params__.names[self.__index_result__(i)] for i in range(0, self.__num_result__())]
+        if not len(self.__params__.fields):
+            return list(range(0, len(names)))
+        need = set()
+        for name in self.__params__.fields:
+            depends = derived_depends(name) if name not in names else None
+            if depends is None and name not in names:
+                raise TFEMException('fields_err')
+            need.update([name] if depends is None else depends)
+        return [i for i in range(0, len(names)) if names[i] in need]
+
+    # Имена вычисляемых функций
+    def __result_names__(self):
+        return [self.__params__.names[self.__index_result__(i)] for i in self.__selected_results__()]
+
+    # Запись результатов для момента времени t в двоичный файл
+    def __save_step__(self, t=0):
+        if self.__result_writer__ is not None:
+            self.__result_writer__.append(t, self.__result__.values(t))
+
     # Задание сетки
     def set_mesh(self, mesh):
         self.__mesh__ = mesh
 
     # Задание параметров расчета
+    def set_progress(self, progress):
+        self.__progress__ = progress
+
     def set_params(self, params):
         self.__params__ = params
+        self.__result__ = TResultStore(params.result_type)
 
     # Возврат результатов расчета
     def get_result(self):
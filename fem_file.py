@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#        Чтение и запись (в том числе сжатых) файлов данных
+###################################################################
+
+import bz2
+import gzip
+import lzma
+import os
+
+# Поддерживаемые форматы сжатия (определяются по расширению файла)
+Compression = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+    '.lzma': lzma.open,
+    '.bz2': bz2.open
+}
+
+# Ошибки, возникающие при чтении (распаковке) файла
+FileError = (IOError, EOFError, lzma.LZMAError)
+
+
+# Открытие файла в текстовом режиме с потоковой (без временных копий) распаковкой или сжатием
+def open_file(name, mode='r'):
+    compress = Compression.get(os.path.splitext(name)[1].lower())
+    if compress is None:
+        return open(name, mode)
+    return compress(name, mode + 't')
+
+
+# Имя файла без пути, расширения и суффикса сжатия
+def base_name(name):
+    name = os.path.basename(name)
+    if os.path.splitext(name)[1].lower() in Compression:
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#     Построение регулярных сеток заданного размера (для тестов)
+###################################################################
+#
+# Запуск:
+#   python fem_generator.py fe_3d_8 1000000 box.trpa.gz   (тип КЭ, примерное кол-во степеней свободы, файл)
+
+import sys
+import numpy as np
+from fem_mesh import TMesh, FEType
+from fem_error import TFEMException
+
+# Размерность области для типов КЭ
+FEDim = {
+    'fe_1d_2': 1,
+    'fe_2d_3': 2,
+    'fe_2d_4': 2,
+    'fe_3d_4': 3,
+    'fe_3d_8': 3
+}
+
+# Разбиение шестигранной ячейки на тетраэдры вдоль диагонали 0-6 (одинаковое для всех ячеек, поэтому согласованное)
+HexToTet = [[0, 1, 2, 6], [0, 2, 3, 6], [0, 3, 7, 6], [0, 7, 4, 6], [0, 4, 5, 6], [0, 5, 1, 6]]
+
+
+# Кол-во разбиений по каждой оси, при котором кол-во степеней свободы близко к заданному
+def divisions(fe_type, dofs):
+    if fe_type not in FEDim:
+        raise TFEMException('unknown_fe_err')
+    dim = FEDim[fe_type]
+    nodes = max(float(dofs)/dim, 2.0)
+    return max(int(round(nodes**(1.0/dim))) - 1, 1)
+
+
+# Регулярная сетка прямоугольной области size (по осям) с n разбиениями по каждой оси
+def generate_mesh(fe_type, n, size=(1.0, 1.0, 1.0)):
+    if fe_type not in FEType:
+        raise TFEMException('unknown_fe_err')
+    dim = FEDim[fe_type]
+    n = [n]*dim if np.isscalar(n) else list(n)[0:dim]
+    # Узлы (номер узла: i + j*(nx + 1) + k*(nx + 1)*(ny + 1))
+    axes = [np.linspace(0.0, size[d], n[d] + 1) for d in range(0, dim)]
+    grid = np.meshgrid(*axes, indexing='ij')
+    xyz = np.stack([g.ravel(order='F') for g in grid], axis=1)
+    # Номер первого узла каждой ячейки и смещения ее вершин
+    shape = [m + 1 for m in n]
+    cell = np.stack(np.meshgrid(*[np.arange(0, m) for m in n], indexing='ij'), axis=-1).reshape(-1, dim, order='F')
+    first = np.ravel_multi_index(tuple(cell.T), shape, order='F')
+    if dim == 1:
+        corner = [[0], [1]]
+    elif dim == 2:
+        corner = [[0, 0], [1, 0], [1, 1], [0, 1]]
+    else:
+        corner = [[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0], [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]]
+    offset = np.ravel_multi_index(tuple(np.array(corner).T), shape, order='F')
+    fe = first[:, np.newaxis] + offset[np.newaxis, :]
+    if fe_type == 'fe_2d_3':
+        fe = np.concatenate([fe[:, [0, 1, 2]], fe[:, [0, 2, 3]]])
+    elif fe_type == 'fe_3d_4':
+        fe = np.concatenate([fe[:, t] for t in HexToTet])
+        # Положительная ориентация тетраэдров
+        p = xyz[fe]
+        negative = np.linalg.det(p[:, 1:] - p[:, 0:1]) < 0
+        fe[negative] = fe[negative][:, [0, 2, 1, 3]]
+    mesh = TMesh()
+    mesh.fe_type = fe_type
+    mesh.freedom = dim
+    mesh.x = xyz[:, 0].tolist()
+    mesh.y = xyz[:, 1].tolist() if dim > 1 else []
+    mesh.z = xyz[:, 2].tolist() if dim > 2 else []
+    mesh.fe = fe.tolist()
+    if dim > 1:
+        mesh.extract_surface()
+    return mesh
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 4:
+        print('Usage: fem_generator.py fe_type dofs file')
+        sys.exit(2)
+    try:
+        m = generate_mesh(sys.argv[1], divisions(sys.argv[1], float(sys.argv[2])))
+        m.save(sys.argv[3])
+    except TFEMException as err:
+        err.print_error()
+        sys.exit(1)
+    print('%s: %d nodes, %d FE, %d DOF' % (sys.argv[3], len(m.x), len(m.fe), len(m.x)*m.freedom))
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#      Кэш геометрических характеристик конечных элементов сетки
+###################################################################
+
+from fem_check import corner_jacobians
+
+
+# Коэффициенты функций форм, их производные в вершинах, якобианы и объемы всех КЭ сетки.
+# Данные вычисляются один раз и хранятся, пока их суммарный объем не превышает max_size байт;
+# сверх этого предела (или при max_size = 0) они вычисляются заново при каждом обращении
+class TGeometryCache:
+    def __init__(self, mesh, fe, max_size=0):
+        self.mesh = mesh                # Сетка
+        self.fe = fe                    # КЭ, задающий функции форм
+        self.max_size = max_size        # Предельный объем хранимых данных (байт)
+        self.size = 0                   # Текущий объем хранимых данных
+        self.__data__ = {}
+
+    # Коэффициенты функций форм всех КЭ (КЭ x функция формы x коэффициент)
+    def coefficients(self):
+        return self.__cached__('c', lambda: self.fe.shape_coefficients(self.coords()).copy())
+
+    # Производные функций форм в вершинах КЭ (КЭ x вершина x координата x функция формы)
+    def gradients(self):
+        return self.__cached__('gradients', lambda: self.fe.shape_gradients(self.coords(), self.coefficients()))
+
+    # Якобианы в вершинах КЭ
+    def jacobians(self):
+        return self.__cached__('jacobians', lambda: corner_jacobians(self.mesh.fe_type, self.coords()))
+
+    # Объемы КЭ
+    def volumes(self):
+        return self.mesh.volumes()
+
+    # Координаты вершин всех КЭ (КЭ x вершина x 3)
+    def coords(self):
+        return self.__cached__('coords', lambda: self.mesh.coord_array()[self.mesh.fe_array()])
+
+    # Очистка кэша
+    def clear(self):
+        self.__data__ = {}
+        self.size = 0
+
+    def __cached__(self, name, calc):
+        if name in self.__data__:
+            return self.__data__[name]
+        data = calc()
+        if self.size + data.nbytes <= self.max_size:
+            self.__data__[name] = data
+            self.size += data.nbytes
+        return data
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#        Выполнение расчетов по описаниям заданий (JSON)
+###################################################################
+#
+# Запуск:
+#   python fem_job.py cube.json                              (результаты - в каталоге файла задания)
+#   python fem_job.py jobs/*.json -j 4 -o results            (пакетный режим: 4 процесса, результаты - в results)
+#
+# Описание задания (пути к сетке - относительно файла задания, к результатам - относительно каталога вывода):
+#   {
+#     "mesh": "../mesh/cube.trpa",
+#     "renumber": "rcm",
+#     "problem_type": "static",
+#     "solve_method": "direct",
+#     "eps": 1.0E-6, "width": 10, "precision": 5,
+#     "elasticity": {"e": [203200], "m": [0.27]},
+#     "density": 1.0E+3, "damping": 1.0E-2, "time": [0, 1.0, 0.25],
+#     "variables": {"P": -1000},
+#     "boundary_conditions": [{"value": "0", "predicate": "z=0", "direction": "xyz"}],
+#     "initial_conditions": [{"value": "0", "direction": ["u", "v_t"]}],
+#     "volume_loads": [], "surface_loads": [{"value": "P", "predicate": "z=1", "direction": "z"}],
+#     "concentrated_loads": [],
+#     "output": {"result": "cube.res", "fields": ["U", "Seqv"], "result_file": "cube.femres", "vtk": "cube",
+#                "plots": [{"function": "U", "t": 0, "file": "cube_u.png"}]},
+#     "checkpoint": {"file": "cube.ckpt", "interval": 10, "restart": true},
+#     "matrix_cache": {"path": "cache", "size": 1024}
+#   }
+# Направление задается строкой из букв x, y, z (или списком), начальное условие - списком из u, v, w, u_t, ..., w_t_t
+# (или целым числом - кодом из fem_defs). Для каждого задания в каталоге вывода создаются <задание>.log (вывод
+# расчета) и <задание>.report.json (состояние, время фаз расчета и пиковая память), для всех - summary.json (в каталоге
+# вывода или текущем)
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import traceback
+from multiprocessing import Pool
+from time import perf_counter
+from fem_defs import DIR_X, DIR_Y, DIR_Z, INIT_U, INIT_V, INIT_W, INIT_U_T, INIT_V_T, INIT_W_T, INIT_U_T_T, \
+    INIT_V_T_T, INIT_W_T_T
+from fem_error import TFEMException
+from fem_object import TObject
+from fem_timer import timer
+from fem_progress import peak_rss
+
+# Коды направлений
+Direction = {'x': DIR_X, 'y': DIR_Y, 'z': DIR_Z}
+
+# Коды начальных условий
+InitDirection = {
+    'u': INIT_U, 'v': INIT_V, 'w': INIT_W,
+    'u_t': INIT_U_T, 'v_t': INIT_V_T, 'w_t': INIT_W_T,
+    'u_t_t': INIT_U_T_T, 'v_t_t': INIT_V_T_T, 'w_t_t': INIT_W_T_T
+}
+
+# Виды условий задания и соответствующие им методы TObject
+JobCondition = {
+    'boundary_conditions': 'add_boundary_condition',
+    'volume_loads': 'add_volume_load',
+    'surface_loads': 'add_surface_load',
+    'concentrated_loads': 'add_concentrated_load'
+}
+
+# Допустимые ключи описания задания
+JobKey = ['mesh', 'renumber', 'problem_type', 'solve_method', 'eps', 'width', 'precision', 'elasticity', 'density',
+          'damping', 'time', 'variables', 'initial_conditions', 'output', 'result_type', 'cache_size', 'checkpoint',
+          'matrix_cache'] + \
+         list(JobCondition)
+
+
+# Код направления: целое число, строка из букв ('xy') или их список (['x', 'y'])
+def direction(value, codes=Direction):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = [value] if value in codes else list(value)
+    try:
+        res = 0
+        for name in value:
+            res |= codes[name.lower()]
+    except (KeyError, TypeError, AttributeError):
+        raise TFEMException('job_err')
+    return res
+
+
+# Загрузка описания задания
+def load_job(name):
+    try:
+        with open(name) as file:
+            job = json.load(file)
+    except IOError:
+        raise TFEMException('read_file_err')
+    except ValueError:
+        raise TFEMException('job_err')
+    if not isinstance(job, dict) or 'mesh' not in job or any(key not in JobKey for key in job):
+        raise TFEMException('job_err')
+    return job
+
+
+# Постановка задачи по описанию задания (path - каталог файла задания)
+def setup_job(obj, job, path):
+    if not obj.set_mesh(os.path.join(path, job['mesh'])):
+        raise TFEMException('job_mesh_err')
+    if 'renumber' in job and not obj.renumber_mesh(job['renumber']):
+        raise TFEMException('renumber_method_err')
+    try:
+        obj.set_problem_type(job.get('problem_type', 'static'))
+        obj.set_solve_method(job.get('solve_method', 'direct'))
+        for key in ['eps', 'width', 'precision', 'density', 'damping', 'result_type', 'cache_size']:
+            if key in job:
+                getattr(obj, 'set_' + key)(job[key])
+        if 'elasticity' in job:
+            obj.set_elasticity(list(job['elasticity']['e']), list(job['elasticity']['m']))
+        if 'time' in job:
+            obj.set_time(*job['time'])
+        for var, val in job.get('variables', {}).items():
+            obj.add_variable(var, float(val))
+        for key, method in JobCondition.items():
+            for c in job.get(key, []):
+                getattr(obj, method)(str(c['value']), c.get('predicate', ''), direction(c['direction']))
+        for c in job.get('initial_conditions', []):
+            obj.add_initial_condition(str(c['value']), direction(c['direction'], InitDirection))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise TFEMException('job_err')
+
+
+# Вывод результатов по описанию задания (out - каталог вывода)
+def write_output(obj, output, out):
+    if 'result' in output and not obj.print_result(os.path.join(out, output['result']), fields=output.get('fields')):
+        raise TFEMException('job_output_err')
+    if 'vtk' in output and not obj.export_vtk(os.path.join(out, output['vtk']), output.get('vtk_encoding', 'raw')):
+        raise TFEMException('job_output_err')
+    for p in output.get('plots', []):
+        if not obj.save_plot(p['function'], os.path.join(out, p['file']), p.get('t', 0)):
+            raise TFEMException('job_output_err')
+
+
+# Выполнение задания (в отдельном процессе): вывод расчета - в <out>/<задание>.log
+def run_job(name, out):
+    timer.reset()
+    job_name = os.path.splitext(os.path.basename(name))[0]
+    res = {'job': name}
+    start = perf_counter()
+    try:
+        with open(os.path.join(out, job_name + '.log'), 'w') as log, contextlib.redirect_stdout(log):
+            try:
+                job = load_job(name)
+                obj = TObject()
+                setup_job(obj, job, os.path.dirname(os.path.abspath(name)))
+                output = job.get('output', {})
+                if 'fields' in output:
+                    obj.set_fields(output['fields'])
+                if 'result_file' in output:
+                    obj.set_result_file(os.path.join(out, output['result_file']))
+                if 'matrix_cache' in job:
+                    c = job['matrix_cache']
+                    obj.set_matrix_cache(os.path.join(out, c['path']), c.get('size', 1024))
+                if 'checkpoint' in job:
+                    c = job['checkpoint']
+                    obj.set_checkpoint(os.path.join(out, c['file']), c.get('interval', 10), c.get('restart', True))
+                if not obj.calc():
+                    raise TFEMException('job_calc_err')
+                write_output(obj, output, out)
+                res['status'] = 'ok'
+            except TFEMException as err:
+                err.print_error()
+                res['status'] = 'error'
+                res['error'] = err.error
+            except Exception as err:
+                traceback.print_exc(file=log)
+                res['status'] = 'error'
+                res['error'] = ''.join(traceback.format_exception_only(type(err), err)).strip()
+    except IOError:
+        res['status'] = 'error'
+        res['error'] = 'write_file_err'
+    res['total'] = perf_counter() - start
+    res['phases'] = timer.report()
+    res['peak_memory'] = peak_rss()
+    try:
+        with open(os.path.join(out, job_name + '.report.json'), 'w') as file:
+            json.dump(res, file, indent=2, sort_keys=True)
+    except IOError:
+        pass
+    return res
+
+
+# Проверка уникальности имен заданий в каждом каталоге вывода (их файлы <задание>.log и <задание>.report.json
+# не должны совпадать)
+def check_job_names(names, outs):
+    used = set()
+    for name, out in zip(names, outs):
+        key = (os.path.abspath(out), os.path.splitext(os.path.basename(name))[0])
+        if key in used:
+            raise TFEMException('job_name_err')
+        used.add(key)
+
+
+# Выполнение заданий в processes процессах (каждое задание - в новом процессе), outs - каталоги вывода заданий
+def run_jobs(names, outs, processes=1):
+    with Pool(processes, maxtasksperchild=1) as pool:
+        pending = [pool.apply_async(run_job, (name, out)) for name, out in zip(names, outs)]
+        res = []
+        for name, r in zip(names, pending):
+            r = r.get()
+            print('%-32s %-6s %9.3f s %10s Kb %s' % (os.path.basename(name), r['status'], r['total'],
+                                                    r['peak_memory'] if r['peak_memory'] is not None else '-',
+                                                    r.get('error', '')))
+            res.append(r)
+    return res
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FEM job runner')
+    parser.add_argument('jobs', nargs='+', help='JSON job files')
+    parser.add_argument('-j', '--processes', type=int, default=1, help='number of worker processes')
+    parser.add_argument('-o', '--output', help='output directory (default: directory of each job file)')
+    args = parser.parse_args()
+    if args.output is not None:
+        os.makedirs(args.output, exist_ok=True)
+        out = [args.output]*len(args.jobs)
+    else:
+        out = [os.path.dirname(os.path.abspath(name)) for name in args.jobs]
+    try:
+        check_job_names(args.jobs, out)
+    except TFEMException as err:
+        err.print_error()
+        return 2
+    results = run_jobs(args.jobs, out, args.processes)
+    with open(os.path.join(args.output or '.', 'summary.json'), 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    return 0 if all(r['status'] == 'ok' for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
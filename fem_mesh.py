@@ -4,8 +4,14 @@
 #           Конечно-элементная модель объекта расчета
 ###################################################################
 
-import math
+import os
+import numpy as np
+from itertools import islice
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import reverse_cuthill_mckee
 from fem_error import TFEMException
+from fem_file import open_file, FileError
+from fem_geometry import TGeometryCache
 
 # Типы конечных элементов
 FEType = [
@@ -16,6 +22,32 @@ FEType = [
     'fe_3d_8'
 ]
 
+# Коды типов КЭ в файле сетки
+FECode = {
+    'fe_2d_3': 3,
+    'fe_3d_4': 4,
+    'fe_3d_8': 8,
+    'fe_2d_4': 24,
+    'fe_1d_2': 34
+}
+
+# Методы перенумерации узлов
+RenumberMethod = [
+    'rcm',      # обратный алгоритм Катхилла - Макки (уменьшение ширины ленты)
+    'morton'    # упорядочивание вдоль кривой Мортона (Z-кривой)
+]
+
+# Расширение файла с исходными номерами узлов перенумерованной сетки
+PermExt = '.perm'
+
+# Грани (ребра) КЭ в локальной нумерации его узлов
+FEFace = {
+    'fe_2d_3': [[0, 1], [1, 2], [2, 0]],
+    'fe_2d_4': [[0, 1], [1, 2], [2, 3], [3, 0]],
+    'fe_3d_4': [[0, 1, 2], [0, 1, 3], [1, 2, 3], [0, 2, 3]],
+    'fe_3d_8': [[0, 1, 2, 3], [0, 1, 5, 4], [1, 2, 6, 5], [3, 2, 6, 7], [0, 3, 7, 4], [4, 5, 6, 7]]
+}
+
 
 class TMesh:
     def __init__(self):
@@ -25,8 +57,20 @@ class TMesh:
         self.y = []
         self.z = []
         self.surface = []       # Связи граничных элементов
+        self.surface_added = 0  # Кол-во ГЭ, добавленных при загрузке (отсутствующих в файле)
         self.fe = []            # Связи в КЭ
         self.freedom = 0        # Кол-во степеней свободы
+        self.node_id = []       # Исходные номера узлов (после перенумерации)
+        self.__reset_cache__()
+
+    # Сброс вычисляемых по сетке (кэшируемых) данных
+    def __reset_cache__(self):
+        self.__volumes__ = None         # Объемы КЭ
+        self.__squares__ = None         # Площади ГЭ
+        self.__fe_array__ = None        # Связи в КЭ в виде массива
+        self.__node_fe__ = None         # Инцидентность узел - КЭ (CSR: указатели, индексы)
+        self.__node_node__ = None       # Смежность узел - узел (CSR: указатели, индексы)
+        self.__geometry__ = None        # Геометрические характеристики КЭ
 
     @staticmethod
     def get_fe_data(t):
@@ -44,45 +88,135 @@ class TMesh:
             raise TFEMException('unknown_fe_err')
 
     def load(self, name):
+        self.mesh_file = name
+        self.__reset_cache__()
+        try:
+            with open_file(self.mesh_file) as file:
+                self.fe_type, size_surface, size_fe, self.freedom = self.get_fe_data(int(file.readline()))
+                # Считываем узлы
+                xyz = self.__read_block__(file, self.freedom, float)
+                self.x = xyz[:, 0].tolist()
+                if self.freedom > 1:
+                    self.y = xyz[:, 1].tolist()
+                if self.freedom > 2:
+                    self.z = xyz[:, 2].tolist()
+                # Считываем КЭ
+                self.fe = self.__read_block__(file, size_fe, int).tolist()
+                # Считываем ГЭ
+                self.surface = self.__read_block__(file, size_surface, int).tolist() if size_surface else []
+            # Исходные номера узлов ранее перенумерованной сетки
+            self.node_id = []
+            if os.path.exists(self.mesh_file + PermExt):
+                self.node_id = np.loadtxt(self.mesh_file + PermExt, dtype=int, ndmin=1).tolist()
+                if len(self.node_id) != len(self.x):
+                    raise TFEMException('read_file_err')
+        except FileError + (ValueError,):
+            raise TFEMException('read_file_err')
+        # Построение границы, если она не задана в файле, или дополнение недостающими ГЭ
+        self.surface_added = self.complete_surface() if self.fe_type in FEFace else 0
+
+    # Запись сетки в файл (в том же формате; сжатие - по расширению)
+    def save(self, name):
         try:
-            self.mesh_file = name
-            file = open(self.mesh_file)
-            lines = file.readlines()
-            file.close()
-        except IOError:
+            with open_file(name, 'w') as file:
+                file.write('%d\n' % FECode[self.fe_type])
+                file.write('%d\n' % len(self.x))
+                np.savetxt(file, self.coord_array()[:, 0:self.freedom], fmt='%.17g')
+                file.write('%d\n' % len(self.fe))
+                np.savetxt(file, self.fe_array(), fmt='%d')
+                file.write('%d\n' % len(self.surface))
+                if len(self.surface):
+                    np.savetxt(file, np.array(self.surface, dtype=int), fmt='%d')
+            if len(self.node_id):
+                np.savetxt(name + PermExt, self.node_id, fmt='%d')
+            elif os.path.exists(name + PermExt):
+                os.remove(name + PermExt)
+        except FileError:
+            raise TFEMException('write_file_err')
+
+    # Чтение блока данных (кол-во строк, затем сами строки) по мере распаковки файла
+    @staticmethod
+    def __read_block__(file, columns, dtype):
+        n = int(file.readline())
+        if not n:
+            return np.zeros((0, columns), dtype=dtype)
+        data = np.loadtxt(islice(file, n), dtype=dtype, usecols=range(0, columns), ndmin=2)
+        if len(data) != n:
             raise TFEMException('read_file_err')
-        self.fe_type, size_surface, size_fe, self.freedom = self.get_fe_data(int(lines[0]))
-        # Кол-во узлов
-        n = int(lines[1])
-        # Считываем узлы
-        index = 2
-        for i in range(0, n):
-            self.x.append(float(lines[2 + i].split()[0]))
-            if self.freedom > 1:
-                self.y.append(float(lines[2 + i].split()[1]))
-            if self.freedom > 2:
-                self.z.append(float(lines[2 + i].split()[2]))
-            index += 1
-        # Кол-во КЭ
-        n = int(lines[index])
-        index += 1
-        # Считываем КЭ
-        for i in range(0, n):
-            row = []
-            for j in range(0, size_fe):
-                row.append(int(lines[index].split()[j]))
-            self.fe.append(row)
-            index += 1
-        # Кол-во ГЭ
-        n = int(lines[index])
-        index += 1
-        # Считываем ГЭ
-        for i in range(0, n):
-            row = []
-            for j in range(0, size_surface):
-                row.append(int(lines[index].split()[j]))
-            self.surface.append(row)
-            index += 1
+        return data
+
+    # Выделение граничных элементов: грани (ребра) КЭ, принадлежащие ровно одному КЭ
+    def extract_surface(self):
+        fe = self.fe_array()
+        faces = fe[:, FEFace[self.fe_type]].reshape(-1, len(FEFace[self.fe_type][0]))
+        # Упорядочиваем узлы граней, чтобы одинаковые грани соседних КЭ совпадали
+        keys = np.sort(faces, axis=1)
+        order = np.lexsort(keys.T[::-1])
+        keys = keys[order]
+        diff = np.any(keys[1:] != keys[:-1], axis=1)
+        single = np.concatenate(([True], diff)) & np.concatenate((diff, [True]))
+        self.surface = faces[np.sort(order[single])].tolist()
+        self.__squares__ = None
+
+    # Дополнение заданных ГЭ недостающими граничными гранями КЭ (заданные ГЭ сохраняются, в том числе не лежащие
+    # на границе); возвращает кол-во добавленных ГЭ
+    def complete_surface(self):
+        surface = self.surface
+        self.extract_surface()
+        if not len(surface):
+            return len(self.surface)
+        extracted = np.array(self.surface, dtype=int)
+        known = set(map(tuple, np.sort(np.array(surface, dtype=int), axis=1).tolist()))
+        missing = [face for face, key in zip(extracted.tolist(), np.sort(extracted, axis=1).tolist())
+                   if tuple(key) not in known]
+        self.surface = list(surface) + missing
+        return len(missing)
+
+    # Перенумерация узлов для улучшения локальности данных (КЭ упорядочиваются по наименьшему номеру узла)
+    def renumber(self, method='rcm'):
+        if method == 'rcm':
+            ptr, index = self.node_node_adjacency()
+            graph = csr_matrix((np.ones(len(index)), index, ptr), shape=(len(self.x), len(self.x)))
+            perm = reverse_cuthill_mckee(graph, symmetric_mode=True)
+        elif method == 'morton':
+            perm = np.argsort(self.__morton_code__(), kind='stable')
+        else:
+            raise TFEMException('renumber_method_err')
+        # perm[i] - старый номер узла, получающего новый номер i
+        perm = np.asarray(perm, dtype=int)
+        new_index = np.empty(len(perm), dtype=int)
+        new_index[perm] = np.arange(len(perm))
+        xyz = self.coord_array()[perm]
+        self.x = xyz[:, 0].tolist()
+        if len(self.y):
+            self.y = xyz[:, 1].tolist()
+        if len(self.z):
+            self.z = xyz[:, 2].tolist()
+        fe = new_index[self.fe_array()]
+        self.fe = fe[np.argsort(fe.min(axis=1), kind='stable')].tolist()
+        if len(self.surface):
+            surface = new_index[np.array(self.surface, dtype=int)]
+            self.surface = surface[np.argsort(surface.min(axis=1), kind='stable')].tolist()
+        self.node_id = (np.array(self.node_id, dtype=int)[perm] if len(self.node_id) else perm).tolist()
+        self.__reset_cache__()
+
+    # Текущие номера узлов в порядке возрастания их исходных номеров
+    def original_order(self):
+        if not len(self.node_id):
+            return range(0, len(self.x))
+        return np.argsort(self.node_id).tolist()
+
+    # Коды узлов вдоль кривой Мортона (по 21 биту на координату)
+    def __morton_code__(self):
+        xyz = self.coord_array()
+        size = xyz.max(axis=0) - xyz.min(axis=0)
+        size[size == 0] = 1.0
+        grid = ((xyz - xyz.min(axis=0))/size*(2**21 - 1)).astype(np.uint64)
+        code = np.zeros(len(xyz), dtype=np.uint64)
+        for bit in range(20, -1, -1):
+            for axis in range(0, 3):
+                code = (code << np.uint64(1)) | ((grid[:, axis] >> np.uint64(bit)) & np.uint64(1))
+        return code
 
     def fe_name(self):
         if self.fe_type == 'fe_1d_2':
@@ -101,75 +235,126 @@ class TMesh:
 
     # Вычисление длины (площади) заданного граничного элемента
     def square(self, index):
-        x = [0]*len(self.surface[index])
-        y = [0]*len(self.surface[index])
-        z = [0]*len(self.surface[index])
-        for i in range(0, len(self.surface[index])):
-            x[i], y[i], z[i] = self.get_coord(self.surface[index][i])
-        s = 0
-        if len(x) == 2:     # Граничный элемент - отрезок
-            s = math.sqrt((x[0] - x[1])**2 + (y[0] - y[1])**2)
-        elif len(x) == 3:   # Граничный элемент - треугольник
-            a = math.sqrt((x[0] - x[1])**2 + (y[0] - y[1])**2 + (z[0] - z[1])**2)
-            b = math.sqrt((x[0] - x[2])**2 + (y[0] - y[2])**2 + (z[0] - z[2])**2)
-            c = math.sqrt((x[2] - x[1])**2 + (y[2] - y[1])**2 + (z[2] - z[1])**2)
-            p = 0.5*(a + b + c)
-            s = math.sqrt(p*(p - a)*(p - b)*(p - c))
-        elif len(x) == 4:   # Граничный элемент - четырехугольник
-            a = math.sqrt((x[0] - x[1])**2 + (y[0] - y[1])**2 + (z[0] - z[1])**2)
-            b = math.sqrt((x[0] - x[2])**2 + (y[0] - y[2])**2 + (z[0] - z[2])**2)
-            c = math.sqrt((x[2] - x[1])**2 + (y[2] - y[1])**2 + (z[2] - z[1])**2)
-            p = 0.5*(a + b + c)
-            s = math.sqrt(p*(p - a)*(p - b)*(p - c))
-
-            a = math.sqrt((x[0] - x[3])**2 + (y[0] - y[3])**2 + (z[0] - z[3])**2)
-            b = math.sqrt((x[0] - x[2])**2 + (y[0] - y[2])**2 + (z[0] - z[2])**2)
-            c = math.sqrt((x[2] - x[3])**2 + (y[2] - y[3])**2 + (z[2] - z[3])**2)
-            p = 0.5*(a + b + c)
-            s += math.sqrt(p*(p - a)*(p - b)*(p - c))
-        return s
+        return self.squares()[index]
 
     # Вычисление объема (длины, площади) заданного конечного элемента
     def volume(self, index):
-        x = [0]*len(self.fe[index])
-        y = [0]*len(self.fe[index])
-        z = [0]*len(self.fe[index])
-        for i in range(0, len(self.fe[index])):
-            x[i], y[i], z[i] = self.get_coord(self.fe[index][i])
-        v = 0
+        return self.volumes()[index]
+
+    # Координаты всех узлов в виде массива (n x 3)
+    def coord_array(self):
+        xyz = np.zeros((len(self.x), 3))
+        xyz[:, 0] = self.x
+        if len(self.y):
+            xyz[:, 1] = self.y
+        if len(self.z):
+            xyz[:, 2] = self.z
+        return xyz
+
+    # Кол-во узлов КЭ (0 - если тип КЭ не задан)
+    def fe_size(self):
+        return self.get_fe_data(FECode[self.fe_type])[2] if self.fe_type in FECode else 0
+
+    # Связи в КЭ в виде массива (ne x кол-во узлов КЭ)
+    def fe_array(self):
+        if not len(self.fe):
+            return np.empty((0, self.fe_size()), dtype=int)
+        if self.__fe_array__ is None:
+            self.__fe_array__ = np.array(self.fe, dtype=int).reshape(len(self.fe), -1)
+        return self.__fe_array__
+
+    # Инцидентность узел - КЭ в формате CSR: КЭ, содержащие узел i, - index[ptr[i]:ptr[i + 1]]
+    def node_fe_adjacency(self):
+        if self.__node_fe__ is None:
+            fe = self.fe_array()
+            nodes = fe.ravel()
+            order = np.argsort(nodes, kind='stable')
+            ptr = np.zeros(len(self.x) + 1, dtype=int)
+            np.cumsum(np.bincount(nodes, minlength=len(self.x)), out=ptr[1:])
+            self.__node_fe__ = ptr, order//fe.shape[1]
+        return self.__node_fe__
+
+    # Смежность узлов (через общие КЭ, без самого узла) в формате CSR
+    def node_node_adjacency(self):
+        if self.__node_node__ is None:
+            fe = self.fe_array()
+            n = len(self.x)
+            incidence = csr_matrix((np.ones(fe.size), (fe.ravel(), np.repeat(np.arange(len(fe)), fe.shape[1]))),
+                                   shape=(n, len(fe)))
+            graph = (incidence*incidence.T).tocoo()
+            mask = graph.row != graph.col
+            graph = csr_matrix((np.ones(np.count_nonzero(mask)), (graph.row[mask], graph.col[mask])), shape=(n, n))
+            graph.sort_indices()
+            self.__node_node__ = graph.indptr.astype(int), graph.indices.astype(int)
+        return self.__node_node__
+
+    # Список КЭ, содержащих заданный узел
+    def node_fe(self, i):
+        ptr, index = self.node_fe_adjacency()
+        return index[ptr[i]:ptr[i + 1]]
+
+    # Список узлов, смежных с заданным
+    def node_neighbors(self, i):
+        ptr, index = self.node_node_adjacency()
+        return index[ptr[i]:ptr[i + 1]]
+
+    # Кол-во КЭ, содержащих каждый из узлов
+    def node_valence(self):
+        return np.diff(self.node_fe_adjacency()[0])
+
+    # Кэш геометрических характеристик КЭ (max_size - предельный объем в байтах)
+    def geometry(self, fe, max_size=0):
+        if self.__geometry__ is None or type(self.__geometry__.fe) is not type(fe):
+            self.__geometry__ = TGeometryCache(self, fe, max_size)
+        self.__geometry__.max_size = max_size
+        return self.__geometry__
+
+    # Вычисление длин (площадей) всех граничных элементов (с кэшированием)
+    def squares(self):
+        if self.__squares__ is None:
+            self.__squares__ = self.__calc_squares__()
+        return self.__squares__
+
+    # Вычисление объемов (длин, площадей) всех конечных элементов (с кэшированием)
+    def volumes(self):
+        if self.__volumes__ is None:
+            self.__volumes__ = self.__calc_volumes__()
+        return self.__volumes__
+
+    def __calc_squares__(self):
+        if not len(self.surface):
+            return np.zeros(0)
+        p = self.coord_array()[np.array(self.surface, dtype=int)]
+        if p.shape[1] == 2:     # Граничный элемент - отрезок
+            s = np.linalg.norm(p[:, 1] - p[:, 0], axis=1)
+        elif p.shape[1] == 3:   # Граничный элемент - треугольник
+            s = 0.5*np.linalg.norm(np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]), axis=1)
+        else:                   # Граничный элемент - четырехугольник (площадь через диагонали)
+            s = 0.5*np.linalg.norm(np.cross(p[:, 2] - p[:, 0], p[:, 3] - p[:, 1]), axis=1)
+        return s
+
+    def __calc_volumes__(self):
+        if not len(self.fe):
+            return np.zeros(0)
+        p = self.coord_array()[self.fe_array()]
         if self.fe_type == 'fe_1d_2':
-            v = math.sqrt((x[0] - x[1])**2 + (y[0] - y[1])**2)
+            v = np.linalg.norm(p[:, 1] - p[:, 0], axis=1)
         elif self.fe_type == 'fe_2d_3':
-            a = math.sqrt((x[0] - x[1])**2 + (y[0] - y[1])**2 + (z[0] - z[1])**2)
-            b = math.sqrt((x[0] - x[2])**2 + (y[0] - y[2])**2 + (z[0] - z[2])**2)
-            c = math.sqrt((x[2] - x[1])**2 + (y[2] - y[1])**2 + (z[2] - z[1])**2)
-            p = 0.5*(a + b + c)
-            v = math.sqrt(p*(p - a)*(p - b)*(p - c))
+            v = 0.5*np.linalg.norm(np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0]), axis=1)
         elif self.fe_type == 'fe_2d_4':
-            a = math.sqrt((x[0] - x[1])**2 + (y[0] - y[1])**2 + (z[0] - z[1])**2)
-            b = math.sqrt((x[0] - x[2])**2 + (y[0] - y[2])**2 + (z[0] - z[2])**2)
-            c = math.sqrt((x[2] - x[1])**2 + (y[2] - y[1])**2 + (z[2] - z[1])**2)
-            p = 0.5*(a + b + c)
-            v = math.sqrt(p*(p - a)*(p - b)*(p - c))
-            a = math.sqrt((x[0] - x[3])**2 + (y[0] - y[3])**2 + (z[0] - z[3])**2)
-            b = math.sqrt((x[0] - x[2])**2 + (y[0] - y[2])**2 + (z[0] - z[2])**2)
-            c = math.sqrt((x[2] - x[3])**2 + (y[2] - y[3])**2 + (z[2] - z[3])**2)
-            p = 0.5*(a + b + c)
-            v += math.sqrt(p*(p - a)*(p - b)*(p - c))
+            v = 0.5*np.linalg.norm(np.cross(p[:, 2] - p[:, 0], p[:, 3] - p[:, 1]), axis=1)
         elif self.fe_type == 'fe_3d_4':
-            a = (x[1] - x[0])*(y[2] - y[0])*(z[3] - z[0]) + (x[3] - x[0])*(y[1] - y[0])*(z[2] - z[0]) + \
-                (x[2] - x[0])*(y[3] - y[0])*(z[1] - z[0])
-            b = (x[3] - x[0])*(y[2] - y[0])*(z[1] - z[0]) + (x[2] - x[0])*(y[1] - y[0])*(z[3] - z[0]) + \
-                (x[1] - x[0])*(y[3] - y[0])*(z[2] - z[0])
-            v = math.fabs(a - b)/6.0
-        elif self.fe_type == 'fe_3d_8':
-            ref = [[0, 1, 4, 7], [4, 1, 5, 7], [1, 2, 6, 7], [1, 5, 6, 7], [1, 2, 3, 7], [0, 3, 1, 7]]
-            for i in range(0, 6):
-                a = (x[ref[i][1]] - x[ref[i][0]])*(y[ref[i][2]] - y[ref[i][0]])*(z[ref[i][3]] - z[ref[i][0]]) + \
-                    (x[ref[i][3]] - x[ref[i][0]])*(y[ref[i][1]] - y[ref[i][0]])*(z[ref[i][2]] - z[ref[i][0]]) + \
-                    (x[ref[i][2]] - x[ref[i][0]])*(y[ref[i][3]] - y[ref[i][0]])*(z[ref[i][1]] - z[ref[i][0]])
-                b = (x[ref[i][3]] - x[ref[i][0]])*(y[ref[i][2]] - y[ref[i][0]])*(z[ref[i][1]] - z[ref[i][0]]) + \
-                    (x[ref[i][2]] - x[ref[i][0]])*(y[ref[i][1]] - y[ref[i][0]])*(z[ref[i][3]] - z[ref[i][0]]) + \
-                    (x[ref[i][1]] - x[ref[i][0]])*(y[ref[i][3]] - y[ref[i][0]])*(z[ref[i][2]] - z[ref[i][0]])
-                v += math.fabs(a - b)/6.0
+            v = np.fabs(self.__tet_volume__(p[:, 0], p[:, 1], p[:, 2], p[:, 3]))
+        else:
+            # Разбиение на шесть одинаково ориентированных тетраэдров (точно для плоских граней)
+            ref = [[1, 0, 4, 7], [1, 4, 5, 7], [2, 1, 6, 7], [1, 5, 6, 7], [1, 2, 3, 7], [3, 0, 1, 7]]
+            v = np.zeros(len(p))
+            for r in ref:
+                v += self.__tet_volume__(p[:, r[0]], p[:, r[1]], p[:, r[2]], p[:, r[3]])
+            v = np.fabs(v)
         return v
+
+    # Ориентированный объем тетраэдров
+    @staticmethod
+    def __tet_volume__(p0, p1, p2, p3):
+        return np.einsum('ij,ij->i', p1 - p0, np.cross(p2 - p0, p3 - p0))/6.0
@@ -4,20 +4,53 @@
 #                       Описание объекта расчета
 ###################################################################
 
-import os
 import sys
-import matplotlib.pyplot as plt
 import numpy as np
-from matplotlib import cm
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-from math import fabs, floor
+from multiprocessing import Pool
 from fem_mesh import TMesh
+from fem_check import TMeshCheck
 from fem_fem import TFEM
 from fem_params import TFEMParams
 from fem_static import TFEMStatic
 from fem_dynamic import TFEMDynamic
 from fem_defs import eps
 from fem_error import TFEMException
+from fem_result import TResultStore
+from fem_resfile import TResultFile, is_result_file
+from fem_text import TTextWriter, TTextReader
+from fem_vtk import TVTKWriter
+from fem_timer import timer
+from fem_progress import TProgress
+from fem_file import open_file, base_name, FileError
+
+
+# Модули matplotlib загружаются при первом построении изображения (расчет без визуализации не зависит от matplotlib)
+plt = None
+cm = None
+Poly3DCollection = None
+
+
+# Загрузка модулей matplotlib
+def import_plot():
+    global plt, cm, Poly3DCollection
+    if plt is None:
+        import matplotlib.pyplot
+        import matplotlib.cm
+        import mpl_toolkits.mplot3d.art3d
+        plt, cm, Poly3DCollection = matplotlib.pyplot, matplotlib.cm, mpl_toolkits.mplot3d.art3d.Poly3DCollection
+
+
+# Градации цвета поверхностных граней (спектр)
+SurfaceColor = np.array([
+    # красный - желтый
+    [1.00, 0.00, 0.00], [1.00, 0.25, 0.00], [1.00, 0.50, 0.00], [1.00, 0.75, 0.00],
+    # желтый - зеленый
+    [1.00, 1.00, 0.00], [0.75, 1.00, 0.00], [0.50, 1.00, 0.00], [0.25, 1.00, 0.00],
+    # зеленый - фиолетовый
+    [0.00, 1.00, 0.00], [0.00, 1.00, 0.25], [0.00, 1.00, 0.50], [0.00, 1.00, 0.75],
+    # фиолетовый - синий
+    [0.00, 1.00, 1.00], [0.00, 0.75, 1.00], [0.00, 0.50, 1.00], [0.00, 0.00, 1.00]
+])
 
 
 # Вывод сообщения об ошибке
@@ -29,14 +62,44 @@ class TObject:
     def __init__(self):
         self.__params__ = TFEMParams()  # Параметры расчета
         self.__mesh__ = TMesh()         # КЭ-модель
-        self.__results__ = []           # Список результатов расчета для перемещений, деформаций, ...
+        self.__results__ = TResultStore()   # Результаты расчета для перемещений, деформаций, ...
+        self.__progress__ = TProgress()     # Индикатор прогресса расчета
 
     def set_mesh(self, name):
         try:
-            self.__mesh__.load(name)
-            print('Object: %s' % self.object_name())
-            print('Points: %d' % len(self.__mesh__.x))
-            print('FE: %d - %s' % (len(self.__mesh__.fe), self.__mesh__.fe_name()))
+            with timer.phase('mesh'):
+                self.__mesh__.load(name)
+                print('Object: %s' % self.object_name())
+                print('Points: %d' % len(self.__mesh__.x))
+                print('FE: %d - %s' % (len(self.__mesh__.fe), self.__mesh__.fe_name()))
+                if self.__mesh__.surface_added:
+                    print('Surface: %d boundary elements missing in the mesh file are added' %
+                          self.__mesh__.surface_added)
+                # Проверка КЭ до начала расчета
+                check = TMeshCheck(self.__mesh__)
+                valid = check.run()
+            for line in check.report():
+                print(line)
+            if not valid:
+                raise TFEMException('incorrect_fe_err')
+        except TFEMException as err:
+            err.print_error()
+            return False
+        return True
+
+    # Перенумерация узлов сетки (method: 'rcm' или 'morton')
+    def renumber_mesh(self, method='rcm'):
+        try:
+            self.__mesh__.renumber(method)
+        except TFEMException as err:
+            err.print_error()
+            return False
+        return True
+
+    # Сохранение (перенумерованной) сетки
+    def save_mesh(self, name):
+        try:
+            self.__mesh__.save(name)
         except TFEMException as err:
             err.print_error()
             return False
@@ -44,7 +107,7 @@ class TObject:
 
     # Название объекта
     def object_name(self):
-        return os.path.splitext(os.path.basename(self.__mesh__.mesh_file))[0]
+        return base_name(self.__mesh__.mesh_file)
 
     def set_problem_type(self, problem_type):
         self.__params__.problem_type = problem_type
@@ -76,9 +139,83 @@ class TObject:
     def set_damping(self, damping):
         self.__params__.damping = damping
 
+    def set_result_type(self, result_type):
+        self.__params__.result_type = result_type
+
+    def set_cache_size(self, size):
+        self.__params__.cache_size = size
+
+    # Индикатор прогресса расчета (например, TProgress([]) - без вывода, TProgress([TJSONSink(name)]) - в файл)
+    def set_progress(self, progress):
+        self.__progress__ = progress
+
+    # Профилирование фаз расчета: файлы <фаза>.pstats (cProfile) и <фаза>.memory.txt (tracemalloc) в каталоге path;
+    # пустая строка - без профилирования
+    def set_profile(self, path, modes=('cpu', 'memory')):
+        self.__params__.profile_dir = path
+        self.__params__.profile_mode = list(modes)
+
+    # Дисковый кэш глобальных матриц в каталоге path (не более size Мб); при повторном расчете той же сетки с теми же
+    # свойствами материала (например, с другими нагрузками) формирование матриц пропускается
+    def set_matrix_cache(self, path, size=1024):
+        self.__params__.matrix_cache = path
+        self.__params__.matrix_cache_size = size
+
+    # Запись контрольной точки динамического расчета в файл name каждые interval шагов по времени;
+    # restart - продолжение расчета с записанной ранее контрольной точки (если файл есть)
+    def set_checkpoint(self, name, interval=10, restart=False):
+        self.__params__.checkpoint_file = name
+        self.__params__.checkpoint_interval = interval if len(name) else 0
+        self.__params__.restart = restart and len(name) > 0
+
+    # Список вычисляемых функций (основных или производных); пустой список - все основные
+    def set_fields(self, fields):
+        self.__params__.fields = fields
+
     def set_names(self, names):
         self.__params__.names = names
 
+    # Запись результатов в двоичный файл по мере расчета
+    def set_result_file(self, name):
+        self.__params__.result_file = name
+
+    # Загрузка результатов из двоичного или текстового (print_result) файла
+    # (times - список нужных моментов времени или None)
+    def load_result(self, name, times=None):
+        try:
+            if is_result_file(name):
+                result = TResultFile(name)
+                self.__results__ = result.to_store(times)
+                self.__params__.problem_type = result.header['problem_type']
+                return True
+            result = TTextReader(name)
+            store = result.to_store(times, self.__params__.result_type)
+        except (IOError, ValueError, KeyError):
+            error('Error: unable to read result file %s' % name)
+            return False
+        # Узлы в текстовом файле выводятся в исходной (до перенумерации) нумерации
+        order = np.array(self.__mesh__.original_order(), dtype=int)
+        if len(order) and len(order) != store.array().shape[2]:
+            error('Error: result file %s does not match the mesh' % name)
+            return False
+        self.__results__ = TResultStore(self.__params__.result_type)
+        for t in store.times:
+            values = np.array(store.values(t))
+            if len(order):
+                values[:, order] = store.values(t)
+            self.__results__.add_step(t, store.names, values)
+        self.__params__.problem_type = 'dynamic' if result.dynamic else 'static'
+        return True
+
+    # Экспорт сетки и результатов в формат VTK (name.vtu или серия name_NNNN.vtu с индексом name.pvd)
+    def export_vtk(self, name, encoding='raw'):
+        try:
+            TVTKWriter(self.__mesh__, self.__params__.names, encoding).write(name, self.__results__)
+        except TFEMException as err:
+            err.print_error()
+            return False
+        return True
+
     def add_boundary_condition(self, e, p, d):
         self.__params__.add_boundary_condition(e, p, d)
 
@@ -105,170 +242,144 @@ class TObject:
             fem = TFEMDynamic()
         fem.set_mesh(self.__mesh__)
         fem.set_params(self.__params__)
+        fem.set_progress(self.__progress__)
         ret = fem.calc()
         if ret:
             self.__results__ = fem.get_result()
         return ret
 
-    # Вывод результатов расчета
-    def print_result(self, *argv):
+    # Вывод результатов расчета (fields - список выводимых основных и производных функций, None - все основные);
+    # False - если файл не открывается или запрошенной функции нет среди результатов
+    def print_result(self, *argv, fields=None):
+        if fields is not None:
+            for name in fields:
+                if self.__results__.find(name, self.__results__.times[0] if len(self.__results__.times) else 0) \
+                        is None:
+                    error('Error: \'%s\' is not a recognized function name' % name)
+                    return False
         file = sys.stdout
         try:
             if len(argv) == 1:
-                file = open(argv[0], 'w')
-        except IOError:
+                file = open_file(argv[0], 'w')
+        except FileError:
             error('Error: unable to open file %s' % argv[0])
-            return
-        if self.__params__.problem_type == 'static':
-            self.__print__(file)
-        else:
-            t = self.__params__.t0
-            while t <= self.__params__.t1:
-                file.write('t = %5.2f\n' % t)
-                self.__print__(file, t)
-                t += self.__params__.th
-                if fabs(t - self.__params__.t1) < self.__params__.eps:
-                    t = self.__params__.t1
-        file.close()
+            return False
+        with timer.phase('output'):
+            if self.__params__.problem_type == 'static':
+                self.__print__(file, 0, fields)
+            else:
+                for t in self.__results__.times:
+                    file.write('t = %5.2f\n' % t)
+                    self.__print__(file, t, fields)
+            file.close()
+        return True
 
     # Вывод результатов расчета для одного момента времени
-    def __print__(self, file, t=0):
-        # Определение ширины позиции
-        len1 = len('%+*.*E' % (self.__params__.width, self.__params__.precision, 3.14159))
-        len2 = len('%d' % len(self.__mesh__.x))
-        # Вывод заголовка
-        file.write('| %*s  (' % (len2, 'N'))
-        for i in range(0, self.__mesh__.freedom):
-            file.write(' %*s' % (len1, self.__params__.names[i]))
-            if i < self.__mesh__.freedom - 1:
-                file.write(',')
-        file.write(') |')
-        for i in range(0, len(self.__results__)):
-            if self.__results__[i].t == t:
-                file.write(' %*s |' % (len1, self.__results__[i].name))
-        file.write('\n')
-        for i in range(0, len(self.__mesh__.x)):
-            file.write('| %*d  (' % (len2, i + 1))
-            file.write(' %+*.*E' % (self.__params__.width, self.__params__.precision, self.__mesh__.x[i]))
-            if len(self.__mesh__.y):
-                file.write(', %+*.*E' % (self.__params__.width, self.__params__.precision, self.__mesh__.y[i]))
-            if len(self.__mesh__.z):
-                file.write(', %+*.*E' % (self.__params__.width, self.__params__.precision, self.__mesh__.z[i]))
-            file.write(') | ')
-            for k in range(0, len(self.__results__)):
-                if self.__results__[k].t == t:
-                    file.write('%+*.*E' %
-                               (self.__params__.width, self.__params__.precision, self.__results__[k].results[i]))
-                    file.write(' | ')
-            file.write('\n')
-        file.write('\n')
-        # Печать итогов
-        file.write('|  %*s  ' % (len2, ' '))
-        for i in range(0, self.__mesh__.freedom):
-            file.write(' %*s' % (len1, ' '))
-            if i < self.__mesh__.freedom - 1:
-                file.write(' ')
-        file.write('  |')
-        for i in range(0, len(self.__results__)):
-            if self.__results__[i].t == t:
-                file.write(' %*s |' % (len1, self.__results__[i].name))
-        file.write('\n')
-        file.write('|   %*s  |' % (self.__mesh__.freedom*(len1 + 1) + self.__mesh__.freedom + len2, 'min:'))
-        for i in range(0, len(self.__results__)):
-            if self.__results__[i].t == t:
-                file.write(' %+*.*E ' % (self.__params__.width, self.__params__.precision, self.__results__[i].min()))
-                file.write('|')
-        file.write('\n')
-        file.write('|   %*s  |' % (self.__mesh__.freedom*(len1 + 1) + self.__mesh__.freedom + len2, 'max:'))
-        for i in range(0, len(self.__results__)):
-            if self.__results__[i].t == t:
-                file.write(' %+*.*E ' % (self.__params__.width, self.__params__.precision, self.__results__[i].max()))
-                file.write('|')
-        file.write('\n\n\n')
+    def __print__(self, file, t=0, fields=None):
+        TTextWriter(self.__mesh__, self.__params__).write(file, self.__results__.step(t, fields))
 
     # Визуализация заданной функции
     def plot(self, fun_name, t=0):
+        if self.__draw__(fun_name, t):
+            # В неинтерактивном режиме (Agg) окна нет
+            manager = plt.gcf().canvas.manager
+            if manager is not None:
+                manager.set_window_title('Result image')
+            plt.show()
+
+    # Сохранение изображения заданной функции в файл (без вывода на экран)
+    def save_plot(self, fun_name, file_name, t=0):
+        if not self.__draw__(fun_name, t):
+            return False
+        plt.savefig(file_name)
+        plt.close('all')
+        return True
+
+    # Пакетное построение изображений в параллельных процессах (plots - список (функция, время, файл))
+    def render(self, plots, processes=None):
+        try:
+            with Pool(processes, initializer=render_init, initargs=(self,)) as pool:
+                ret = pool.starmap(render_plot, plots)
+        except TFEMException as err:
+            err.print_error()
+            return False
+        return all(ret)
+
+    # Построение изображения заданной функции
+    def __draw__(self, fun_name, t=0):
+        import_plot()
         # Проверка корректности задания времени
         if self.__params__.problem_type == 'dynamic' and \
                 ((t < self.__params__.t0 or t > self.__params__.t1) or t % self.__params__.th > eps):
             error('Error: incorrectly specified the time: %5.2f' % t)
-            return
-        # Поиск индекса функции в списке результатов
-        index = -1
-        for i in range(0, len(self.__results__)):
-            if self.__results__[i].name == fun_name and self.__results__[i].t == t:
-                index = i
-                break
-        if index == -1:
+            return False
+        # Поиск функции в списке результатов
+        result = self.__results__.find(fun_name, t)
+        if result is None:
             error('Error: \'%s\' is not a recognized function name' % fun_name)
-            return
+            return False
         # Визуализация результата
         if self.__mesh__.fe_type == 'fe_1d_2':
-            self.__plot_1d_linear__(index)
+            self.__plot_1d_linear__(result)
         elif self.__mesh__.fe_type == 'fe_2d_3':
-            self.__plot_2d_tri__(index)
+            self.__plot_2d_tri__(result)
         elif self.__mesh__.fe_type == 'fe_2d_4':
-            self.__plot_2d_quad__(index)
+            self.__plot_2d_quad__(result)
         elif self.__mesh__.fe_type == 'fe_3d_4':
-            self.__plot_3d_tet__(index)
+            self.__plot_3d_tet__(result)
         elif self.__mesh__.fe_type == 'fe_3d_8':
-            self.__plot_3d_hex__(index)
+            self.__plot_3d_hex__(result)
         # Задание заголовка
         if self.__params__.problem_type == 'dynamic':
             fun_name += ' (t = %5.2f)' % t
-
-        plt.gcf().canvas.set_window_title('Result image')
         plt.title(fun_name)
-        plt.show()
+        return True
 
     # Визуализация заданной функции в случае одномерного линейного КЭ
-    def __plot_1d_linear__(self, index):
-        plt.plot(self.__mesh__.x, self.__results__[index].results, '-', linewidth=2)
+    def __plot_1d_linear__(self, result):
+        plt.plot(self.__mesh__.x, result.results, '-', linewidth=2)
 
     # Визуализация заданной функции в случае плоской треугольной сетки
-    def __plot_2d_tri__(self, index):
+    def __plot_2d_tri__(self, result):
         plt.figure()
         plt.gca().set_aspect('equal')
-#        c_map = cm.get_cmap(name='terrain', lut=None)
-        c_map = cm.get_cmap(name='spectral', lut=None)
+#        c_map = plt.get_cmap('terrain')
+        c_map = plt.get_cmap('nipy_spectral')
         plt.triplot(self.__mesh__.x, self.__mesh__.y, self.__mesh__.fe, lw=0.5, color='white')
-        plt.tricontourf(self.__mesh__.x, self.__mesh__.y, self.__mesh__.fe, self.__results__[index].results, cmap=c_map)
+        plt.tricontourf(self.__mesh__.x, self.__mesh__.y, self.__mesh__.fe, result.results, cmap=c_map)
         plt.colorbar()
 
     # Визуализация заданной функции в случае плоской четырехугольной сетки
-    def __plot_2d_quad__(self, index):
+    def __plot_2d_quad__(self, result):
         plt.figure()
         plt.gca().set_aspect('equal')
-        c_map = cm.get_cmap(name='spectral', lut=None)
+        c_map = plt.get_cmap('nipy_spectral')
         tri = np.array([np.array([T[0], T[1], T[2]]) for T in self.__mesh__.fe])
-        plt.tricontourf(self.__mesh__.x, self.__mesh__.y, tri, self.__results__[index].results, cmap=c_map)
+        plt.tricontourf(self.__mesh__.x, self.__mesh__.y, tri, result.results, cmap=c_map)
         tri = np.array([np.array([T[0], T[2], T[3]]) for T in self.__mesh__.fe])
-        plt.tricontourf(self.__mesh__.x, self.__mesh__.y, tri, self.__results__[index].results, cmap=c_map)
+        plt.tricontourf(self.__mesh__.x, self.__mesh__.y, tri, result.results, cmap=c_map)
         plt.colorbar()
 
     # Визуализация заданной функции в случае КЭ в форме тетраэдра
-    def __plot_3d_tet__(self, index):
+    def __plot_3d_tet__(self, result):
         fig = plt.figure()
         ax = fig.add_subplot(1, 1, 1, projection='3d')
-        triangle_vertices = np.array([np.array([[self.__mesh__.x[T[0]], self.__mesh__.y[T[0]], self.__mesh__.z[T[0]]],
-                                                [self.__mesh__.x[T[1]], self.__mesh__.y[T[1]], self.__mesh__.z[T[1]]],
-                                                [self.__mesh__.x[T[2]], self.__mesh__.y[T[2]], self.__mesh__.z[T[2]]]])
-                                      for T in self.__mesh__.surface])
+        triangle_vertices = self.__mesh__.coord_array()[np.array(self.__mesh__.surface, dtype=int)]
 
         c_map = cm.ScalarMappable()
-        c_map.set_array([self.__results__[index].min(), self.__results__[index].max()])
-        face_colors = self.get_surface_color(self.__results__[index].results)
+        c_map.set_array([result.min(), result.max()])
+        face_colors = self.get_surface_color(result.results)
         coll = Poly3DCollection(triangle_vertices, facecolors=face_colors, edgecolors='none')
         ax.add_collection(coll)
         ax.set_xlim(min(self.__mesh__.x), max(self.__mesh__.x))
         ax.set_ylim(min(self.__mesh__.y), max(self.__mesh__.y))
         ax.set_zlim(min(self.__mesh__.z), max(self.__mesh__.z))
-        plt.colorbar(c_map)
+        plt.colorbar(c_map, ax=ax)
 
     # Визуализация заданной функции в случае кубического КЭ
-    def __plot_3d_hex__(self, index):
+    def __plot_3d_hex__(self, result):
         fig = plt.figure()
-        ax = fig.gca(projection='3d')
+        ax = fig.add_subplot(1, 1, 1, projection='3d')
         ax.set_aspect("auto")
         ax.set_autoscale_on(True)
 
@@ -281,46 +392,50 @@ class TObject:
         #         z = [self.__mesh__.z[self.__mesh__.surface[i][ind1]], self.__mesh__.z[self.__mesh__.surface[i][ind2]]]
         #         ax.plot3D(x, y, z, color="w")
 
-        triangle_vertices1 = np.array([np.array([[self.__mesh__.x[T[0]], self.__mesh__.y[T[0]], self.__mesh__.z[T[0]]],
-                                                 [self.__mesh__.x[T[1]], self.__mesh__.y[T[1]], self.__mesh__.z[T[1]]],
-                                                 [self.__mesh__.x[T[2]], self.__mesh__.y[T[2]], self.__mesh__.z[T[2]]],
-                                                 [self.__mesh__.x[T[0]], self.__mesh__.y[T[0]], self.__mesh__.z[T[0]]],
-                                                 [self.__mesh__.x[T[2]], self.__mesh__.y[T[2]], self.__mesh__.z[T[2]]],
-                                                 [self.__mesh__.x[T[3]], self.__mesh__.y[T[3]], self.__mesh__.z[T[3]]]])
-                                       for T in self.__mesh__.surface])
+        surface = np.array(self.__mesh__.surface, dtype=int)
+        triangle_vertices1 = self.__mesh__.coord_array()[surface[:, [0, 1, 2, 0, 2, 3]]]
 
         c_map = cm.ScalarMappable()
-        c_map.set_array([self.__results__[index].min(), self.__results__[index].max()])
-        face_colors = self.get_surface_color(self.__results__[index].results)
+        c_map.set_array([result.min(), result.max()])
+        face_colors = self.get_surface_color(result.results)
         coll = Poly3DCollection(triangle_vertices1, facecolors=face_colors, edgecolors='none')
         ax.add_collection(coll)
 
         ax.set_xlim(min(self.__mesh__.x), max(self.__mesh__.x))
         ax.set_ylim(min(self.__mesh__.y), max(self.__mesh__.y))
         ax.set_zlim(min(self.__mesh__.z), max(self.__mesh__.z))
-        plt.colorbar(c_map)
+        plt.colorbar(c_map, ax=ax)
 
-    # Определене цвета поверхностной грани
+    # Определене цвета поверхностной грани (по среднему значению функции в ее вершинах)
     def get_surface_color(self, res):
-        # Градации цвета (спектр)
-        colors = [  # красный - желтый
-                    [1.00, 0.00, 0.00], [1.00, 0.25, 0.00], [1.00, 0.50, 0.00], [1.00, 0.75, 0.00],
-                    # желтый - зеленый
-                    [1.00, 1.00, 0.00], [0.75, 1.00, 0.00], [0.50, 1.00, 0.00], [0.25, 1.00, 0.00],
-                    # зеленый - фиолетовый
-                    [0.00, 1.00, 0.00], [0.00, 1.00, 0.25], [0.00, 1.00, 0.50], [0.00, 1.00, 0.75],
-                    # фиолетовый - синий
-                    [0.00, 1.00, 1.00], [0.00, 0.75, 1.00], [0.00, 0.50, 1.00], [0.00, 0.00, 1.00]]
-        u_min = min(res)
-        u_max = max(res)
-        face_colors = []
-        for i in range(0, len(self.__mesh__.surface)):
-            u = 0
-            for j in range(0, len(self.__mesh__.surface[i])):
-                u += res[self.__mesh__.surface[i][j]]
-            u /= len(self.__mesh__.surface[i])
-            index = floor((u - u_min)/((u_max - u_min)/16.0))
-            if index > 15:
-                index = 15
-            face_colors.append(colors[index])
-        return face_colors
+        res = np.asarray(res)
+        surface = np.array(self.__mesh__.surface, dtype=int)
+        u_min = res.min()
+        u_max = res.max()
+        u = res[surface].sum(axis=1)/surface.shape[1]
+        if u_max == u_min:
+            return SurfaceColor[np.zeros(len(surface), dtype=int)]
+        index = np.minimum(np.floor((u - u_min)/((u_max - u_min)/16.0)).astype(int), 15)
+        return SurfaceColor[index]
+
+
+# Объект, изображения которого строятся в процессе пакетной визуализации
+render_object = None
+
+
+# Подготовка процесса пакетной визуализации (вывод только в файлы)
+def render_init(obj):
+    global render_object
+    import_plot()
+    plt.switch_backend('Agg')
+    render_object = obj
+
+
+# Построение изображения в процессе пакетной визуализации
+# (ошибки matplotlib передаются в основной процесс как TFEMException)
+def render_plot(fun_name, t, file_name):
+    try:
+        return render_object.save_plot(fun_name, file_name, t)
+    except Exception as err:
+        error('Error: %s: %s' % (file_name, err))
+        raise TFEMException('render_err')
@@ -85,6 +85,17 @@ class TFEMParams:
         self.names = StdName    # Список имен функций и их аргументов
         self.bc_list = []       # Список краевых условий
         self.var_list = {}      # Список вспомогательных переменных и их значений
+        self.result_type = 'float64'   # Тип хранения результатов ('float32' - вдвое меньше памяти)
+        self.result_file = ''   # Двоичный файл, в который записываются результаты по мере расчета
+        self.fields = []        # Вычисляемые функции (основные или производные), пустой список - все
+        self.cache_size = 512   # Предельный объем кэша геометрии КЭ (Мб), 0 - вычислять при каждом обращении
+        self.profile_dir = ''   # Каталог для результатов профилирования фаз расчета, пустая строка - без профилирования
+        self.profile_mode = ['cpu', 'memory']   # Виды профилирования (cProfile и/или tracemalloc)
+        self.checkpoint_file = ''       # Файл контрольной точки динамического расчета
+        self.checkpoint_interval = 0    # Кол-во шагов по времени между контрольными точками (0 - не записывать)
+        self.restart = False            # Продолжение динамического расчета с контрольной точки (если она есть)
+        self.matrix_cache = ''          # Каталог дискового кэша глобальных матриц, пустая строка - без кэша
+        self.matrix_cache_size = 1024   # Предельный объем дискового кэша глобальных матриц (Мб)
 
     def __add_condition__(self, t, e, p, d):
         c = TBoundaryCondition()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#           Разбиение сетки на сбалансированные подобласти
+###################################################################
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from fem_error import TFEMException
+
+
+# Описание подобласти
+class TSubdomain:
+    def __init__(self):
+        self.fe = []            # Номера КЭ подобласти
+        self.nodes = []         # Глобальные номера узлов подобласти (индекс в списке - локальный номер)
+        self.interface = []     # Узлы, общие с другими подобластями
+        self.halo = []          # КЭ других подобластей, содержащие узлы данной подобласти
+        self.dof = []           # Глобальные номера степеней свободы (индекс в списке - локальный номер)
+
+    # Локальные связи КЭ подобласти (в локальной нумерации узлов)
+    def local_fe(self, mesh):
+        return np.searchsorted(self.nodes, mesh.fe_array()[self.fe])
+
+
+# Разбиение КЭ сетки: рекурсивная координатная бисекция с уточнением по графу смежности КЭ
+class TPartition:
+    def __init__(self, mesh):
+        self.mesh = mesh            # Разбиваемая сетка
+        self.part = []              # Номер подобласти для каждого КЭ
+        self.subdomains = []        # Список подобластей
+        self.imbalance = 0.05       # Допустимое превышение среднего размера подобласти
+        self.passes = 10            # Максимальное кол-во проходов уточнения
+
+    # Разбиение на k подобластей
+    def split(self, k):
+        fe = self.mesh.fe_array()
+        if k < 1 or k > len(fe):
+            raise TFEMException('partition_err')
+        centers = self.mesh.coord_array()[fe].mean(axis=1)
+        part = np.zeros(len(fe), dtype=int)
+        self.__bisect__(centers, np.arange(len(fe)), 0, k, part)
+        if k > 1:
+            self.__refine__(part, k)
+        self.part = part
+        self.subdomains = [self.__create_subdomain__(i) for i in range(0, k)]
+        return self.subdomains
+
+    # Кол-во узлов на границах между подобластями
+    def interface_size(self):
+        return len(np.unique(np.concatenate([s.interface for s in self.subdomains])))
+
+    # Рекурсивная бисекция вдоль наибольшего размера области (пропорционально кол-ву частей)
+    def __bisect__(self, centers, index, first, k, part):
+        if k == 1:
+            part[index] = first
+            return
+        k1 = k//2
+        c = centers[index]
+        axis = np.argmax(c.max(axis=0) - c.min(axis=0))
+        order = index[np.argsort(c[:, axis], kind='stable')]
+        n1 = (len(index)*k1)//k
+        self.__bisect__(centers, order[:n1], first, k1, part)
+        self.__bisect__(centers, order[n1:], first + k1, k - k1, part)
+
+    # Граф смежности КЭ по инцидентности узел - КЭ сетки (КЭ смежны, если имеют общий узел; вес связи - кол-во
+    # общих узлов)
+    def __dual_graph__(self):
+        ptr, index = self.mesh.node_fe_adjacency()
+        incidence = csr_matrix((np.ones(len(index)), index, ptr), shape=(len(ptr) - 1, len(self.mesh.fe_array())))
+        graph = (incidence.T*incidence).tocsr()
+        graph.setdiag(0)
+        graph.eliminate_zeros()
+        return graph
+
+    # Жадное уточнение разбиения: перенос граничных КЭ, уменьшающий кол-во разрезанных связей
+    def __refine__(self, part, k):
+        graph = self.__dual_graph__()
+        size = np.bincount(part, minlength=k)
+        max_size = int(np.ceil(len(part)/float(k)*(1.0 + self.imbalance)))
+        min_size = max(1, int(np.floor(len(part)/float(k)*(1.0 - self.imbalance))))
+        for _ in range(0, self.passes):
+            # Кол-во соседей каждого КЭ в каждой из подобластей
+            counts = (graph*csr_matrix((np.ones(len(part)), (np.arange(len(part)), part)),
+                                       shape=(len(part), k))).toarray()
+            own = counts[np.arange(len(part)), part]
+            gain = counts.max(axis=1) - own
+            moved = 0
+            for i in np.argsort(-gain, kind='stable'):
+                if gain[i] <= 0:
+                    break
+                # Выигрыш пересчитывается с учетом уже выполненных переносов
+                neighbors = graph.indices[graph.indptr[i]:graph.indptr[i + 1]]
+                local = np.bincount(part[neighbors], weights=graph.data[graph.indptr[i]:graph.indptr[i + 1]],
+                                    minlength=k)
+                target = np.argmax(local)
+                if local[target] <= local[part[i]] or size[target] >= max_size or size[part[i]] <= min_size:
+                    continue
+                size[part[i]] -= 1
+                size[target] += 1
+                part[i] = target
+                moved += 1
+            if not moved:
+                break
+
+    # Формирование описания подобласти
+    def __create_subdomain__(self, p):
+        fe = self.mesh.fe_array()
+        freedom = self.mesh.freedom
+        s = TSubdomain()
+        s.fe = np.flatnonzero(self.part == p)
+        s.nodes = np.unique(fe[s.fe])
+        # Узлы, принадлежащие КЭ других подобластей
+        ptr, index = self.mesh.node_fe_adjacency()
+        node = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+        foreign = np.bincount(node, weights=self.part[index] != p, minlength=len(ptr) - 1)
+        s.interface = s.nodes[foreign[s.nodes] > 0]
+        # КЭ других подобластей, содержащие узлы интерфейса
+        is_interface = np.zeros(len(ptr) - 1, dtype=bool)
+        is_interface[s.interface] = True
+        halo = index[is_interface[node]]
+        s.halo = np.unique(halo[self.part[halo] != p])
+        s.dof = (s.nodes[:, np.newaxis]*freedom + np.arange(freedom)).ravel()
+        return s
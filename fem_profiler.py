@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#            Профилирование фаз расчета (cProfile, tracemalloc)
+###################################################################
+
+import cProfile
+import os
+import tracemalloc
+from contextlib import contextmanager
+from fem_error import TFEMException
+
+# Виды профилирования
+ProfileMode = [
+    'cpu',      # cProfile: файл <фаза>.pstats
+    'memory'    # tracemalloc: файл <фаза>.memory.txt с наибольшими выделениями памяти
+]
+
+
+# Профилирование фаз расчета с записью результатов в каталог path (по одному файлу на фазу и вид профилирования;
+# повторные выполнения фазы, например, на каждом шаге по времени, накапливаются)
+class TProfiler:
+    def __init__(self, path, modes=None):
+        modes = list(ProfileMode) if modes is None else list(modes)
+        if any(mode not in ProfileMode for mode in modes):
+            raise TFEMException('profile_mode_err')
+        self.path = path                # Каталог для записи результатов
+        self.modes = modes              # Виды профилирования
+        self.top = 25                   # Кол-во выводимых мест выделения памяти
+        self.frames = 5                 # Глубина стека, сохраняемая tracemalloc
+        self.__cpu__ = {}               # Профили cProfile по фазам
+        self.__memory__ = {}            # Прирост памяти по фазам: место выделения -> [размер, кол-во блоков]
+        self.__peak__ = {}              # Пиковый объем памяти по фазам
+        self.__tracing__ = False
+
+    # Начало профилирования
+    def start(self):
+        if 'memory' in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.__tracing__ = True
+
+    # Окончание профилирования и запись результатов
+    def stop(self):
+        if self.__tracing__:
+            tracemalloc.stop()
+            self.__tracing__ = False
+        self.save()
+
+    # Профилирование фазы
+    @contextmanager
+    def phase(self, name):
+        memory = 'memory' in self.modes and tracemalloc.is_tracing()
+        if memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+        profile = None
+        if 'cpu' in self.modes:
+            profile = self.__cpu__.setdefault(name, cProfile.Profile())
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            if memory:
+                self.__peak__[name] = max(self.__peak__.get(name, 0), tracemalloc.get_traced_memory()[1])
+                stats = self.__memory__.setdefault(name, {})
+                for diff in tracemalloc.take_snapshot().compare_to(before, 'traceback'):
+                    value = stats.setdefault(diff.traceback, [0, 0])
+                    value[0] += diff.size_diff
+                    value[1] += diff.count_diff
+
+    # Запись результатов в каталог
+    def save(self):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            for name, profile in self.__cpu__.items():
+                profile.dump_stats(os.path.join(self.path, name + '.pstats'))
+            for name, stats in self.__memory__.items():
+                with open(os.path.join(self.path, name + '.memory.txt'), 'w') as file:
+                    file.write('Phase: %s\n' % name)
+                    file.write('Peak traced memory: %.1f KiB\n' % (self.__peak__.get(name, 0)/1024.0))
+                    file.write('Net allocated: %.1f KiB\n\n' % (sum(v[0] for v in stats.values())/1024.0))
+                    top = sorted(stats.items(), key=lambda item: -abs(item[1][0]))[0:self.top]
+                    for i, (trace, (size, count)) in enumerate(top):
+                        file.write('#%d: %+.1f KiB in %+d blocks\n' % (i + 1, size/1024.0, count))
+                        for line in trace.format():
+                            file.write(line + '\n')
+                        file.write('\n')
+        except IOError:
+            raise TFEMException('write_file_err')
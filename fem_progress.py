@@ -4,16 +4,101 @@
 #         Реализация отображения прогресса при вычислениях
 ###################################################################
 
+import json
 import sys
+import time
 
+try:
+    import resource
+except ImportError:
+    resource = None
 
-class TProgress:
+
+# Пиковый объем памяти процесса (Кб), None - если не поддерживается
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak//1024 if sys.platform == 'darwin' else peak
+
+
+# Вывод процента выполнения в stdout (в одной строке)
+class TConsoleSink:
     def __init__(self):
+        self.__old__ = 0
+
+    def __call__(self, event):
+        if event['event'] == 'start':
+            self.__old__ = 0
+            sys.stdout.write('\r' + event['process'] + ' 0%')
+        elif event['event'] == 'progress':
+            pos = int((100.0*float(event['current']))/float(event['total'])) if event['total'] > 0 else 100
+            if pos == self.__old__ or not pos:
+                return
+            sys.stdout.write('\r' + event['process'] + ' ' + str(pos) + '%')
+            if pos == 100:
+                sys.stdout.write('\n')
+            self.__old__ = pos
+        elif event['event'] == 'stop' and self.__old__ != 100:
+            sys.stdout.write('\n')
+        sys.stdout.flush()
+
+
+# Запись событий в файл (по одному JSON-объекту в строке); файл закрывается по окончании расчета (TProgress.stop)
+# и при следующем событии открывается снова для дозаписи
+class TJSONSink:
+    def __init__(self, name):
+        self.name = name
+        self.file = open(name, 'a')
+
+    def __call__(self, event):
+        if self.file is None:
+            self.file = open(self.name, 'a')
+        self.file.write(json.dumps(event) + '\n')
+        if event['event'] == 'stop':
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# Передача событий функции пользователя
+class TCallbackSink:
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, event):
+        self.callback(event)
+
+
+# Индикатор прогресса: события начала и окончания процессов (с временем, процессорным временем, пиковой
+# памятью и кол-вом обработанных элементов) и их хода передаются приемникам (sinks). События хода процесса
+# передаются не чаще одного раза в interval секунд. Без приемников (sinks=[]) все вызовы пустые
+class TProgress:
+    def __init__(self, sinks=None, interval=0.1):
+        self.sinks = [TConsoleSink()] if sinks is None else list(sinks)     # Приемники событий
+        self.interval = interval                                            # Минимальный интервал событий хода
         self.__process_id__ = ''
         self.__process_start__ = 0
         self.__process_stop__ = 0
         self.__process_current__ = 0
-        self.__process_old__ = 0
+        self.__started__ = False
+        self.__next_time__ = 0
+        self.__wall__ = 0
+        self.__cpu__ = 0
+        if not len(self.sinks):
+            self.set_process = self.__quiet__
+            self.set_progress = self.__quiet__
+            self.finish = self.__quiet__
+            self.stop = self.__quiet__
 
 #    def set_process(self, pid, start, stop):
 #        self.__process_id__ = pid
@@ -39,22 +124,49 @@ class TProgress:
 #        self.__process_old__ = pos
 
     def set_process(self, pid, start, stop):
+        self.finish()
         self.__process_id__ = pid
         self.__process_start__ = start
         self.__process_stop__ = stop
-        self.__process_old__ = 0
+        self.__process_current__ = 0
+        self.__next_time__ = 0
+        self.__wall__ = time.perf_counter()
+        self.__cpu__ = time.process_time()
         if start <= stop:
-            sys.stdout.write('\r' + self.__process_id__ + ' 0%')
-            sys.stdout.flush()
+            self.__started__ = True
+            self.__emit__('start')
 
     def set_progress(self, current):
         self.__process_current__ = current
-        pos = int((100.0*float(self.__process_current__))/float(self.__process_stop__ - self.__process_start__ + 1))
-        if pos == self.__process_old__ or not pos:
+        if current < self.__process_stop__:
+            now = time.perf_counter()
+            if now < self.__next_time__:
+                return
+            self.__next_time__ = now + self.interval
+        self.__emit__('progress')
+
+    # Завершение текущего процесса
+    def finish(self):
+        if not self.__started__:
             return
-        if pos % 2 == 0:
-            sys.stdout.write('\r' + self.__process_id__ + ' ' + str(pos) + '%')
-            if pos == 100:
-                sys.stdout.write('\n')
-        sys.stdout.flush()
-        self.__process_old__ = pos
+        self.__started__ = False
+        self.__emit__('stop', elapsed=time.perf_counter() - self.__wall__, cpu=time.process_time() - self.__cpu__,
+                      rss=peak_rss())
+
+    # Окончание расчета: завершение текущего процесса и закрытие приемников (с записью буферизованных событий)
+    def stop(self):
+        self.finish()
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+    def __emit__(self, name, **kwargs):
+        event = {'event': name, 'process': self.__process_id__, 'time': time.time(),
+                 'current': self.__process_current__, 'total': self.__process_stop__ - self.__process_start__ + 1}
+        event.update(kwargs)
+        for sink in self.sinks:
+            sink(event)
+
+    @staticmethod
+    def __quiet__(*args):
+        pass
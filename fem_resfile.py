@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#     Двоичный файл результатов с произвольным доступом по времени
+###################################################################
+#
+# Формат файла:
+#   'FEMRES01'      - сигнатура (8 байт)
+#   uint32          - размер заголовка в байтах
+#   заголовок       - JSON (сетка, тип задачи, имена функций, кол-во узлов, тип значений),
+#                     дополненный пробелами до границы 64 байт
+#   записи          - по одной на момент времени: float64 t, затем значения (функции x узлы)
+#
+# Записи имеют одинаковый размер, поэтому файл читается через memmap без разбора,
+# а незавершенная последняя запись (например, при аварийной остановке) игнорируется
+
+import json
+import os
+import struct
+import numpy as np
+from fem_result import TResultStore
+
+ResultSignature = b'FEMRES01'
+
+
+# Проверка сигнатуры двоичного файла результатов
+def is_result_file(name):
+    with open(name, 'rb') as file:
+        return file.read(len(ResultSignature)) == ResultSignature
+
+
+# Запись результатов по мере их получения
+class TResultWriter:
+    def __init__(self, name, header):
+        self.name = name
+        self.header = header
+        self.file = None
+
+    def open(self):
+        text = json.dumps(self.header).encode('utf-8')
+        size = len(ResultSignature) + 4 + len(text)
+        text += b' '*((64 - size % 64) % 64)
+        self.file = open(self.name, 'wb')
+        self.file.write(ResultSignature)
+        self.file.write(struct.pack('<I', len(text)))
+        self.file.write(text)
+        self.file.flush()
+
+    # Добавление записи для момента времени t (values - функции x узлы)
+    def append(self, t, values):
+        self.file.write(struct.pack('<d', t))
+        self.file.write(np.ascontiguousarray(values, dtype=self.header['dtype']).tobytes())
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# Чтение результатов без загрузки всего файла в память
+class TResultFile:
+    def __init__(self, name):
+        self.name = name
+        with open(name, 'rb') as file:
+            if file.read(len(ResultSignature)) != ResultSignature:
+                raise IOError('%s is not a binary result file' % name)
+            size = struct.unpack('<I', file.read(4))[0]
+            self.header = json.loads(file.read(size).decode('utf-8'))
+        self.names = self.header['names']
+        shape = (len(self.names), self.header['nodes'])
+        record = np.dtype([('t', '<f8'), ('values', np.dtype(self.header['dtype']), shape)])
+        offset = len(ResultSignature) + 4 + size
+        count = (os.path.getsize(name) - offset)//record.itemsize
+        self.records = np.memmap(name, dtype=record, mode='r', offset=offset, shape=(count,)) if count else \
+            np.zeros(0, dtype=record)
+        self.__name_index__ = dict((name, i) for i, name in enumerate(self.names))
+        self.__time_index__ = dict((TResultStore.time_key(t), i) for i, t in enumerate(self.times()))
+
+    # Моменты времени, для которых записаны результаты
+    def times(self):
+        return np.array(self.records['t'])
+
+    # Все функции для момента времени t (функции x узлы)
+    def step(self, t=0):
+        return self.records[self.__time_index__[TResultStore.time_key(t)]]['values']
+
+    # Значения функции в момент времени t
+    def get(self, name, t=0):
+        return self.step(t)[self.__name_index__[name]]
+
+    # Значения функции во все моменты времени (моменты времени x узлы)
+    def field(self, name):
+        return self.records['values'][:, self.__name_index__[name], :]
+
+    # Загрузка (всех или части) моментов времени в хранилище результатов
+    def to_store(self, times=None):
+        store = TResultStore(self.header['dtype'])
+        for t in (self.times() if times is None else times):
+            store.add_step(float(t), self.names, self.step(t))
+        return store
@@ -4,16 +4,234 @@
 #      Реализация контейнера для хранения результатов расчета
 ###################################################################
 
+import numpy as np
 
+
+# Модуль вектора перемещений (get(name) - значения основной функции (моменты времени x узлы) или None)
+def displacement_magnitude(get):
+    u = [get(name) for name in ['U', 'V', 'W'] if get(name) is not None]
+    return [np.sqrt(sum(x**2 for x in u))] if len(u) else None
+
+
+# Компоненты тензора напряжений (моменты времени x узлы x 3 x 3); отсутствующие компоненты нулевые
+def stress_tensor(get):
+    if get('Sxx') is None:
+        return None
+    zero = np.zeros_like(get('Sxx'))
+    s = [[get(n) if get(n) is not None else zero for n in row]
+         for row in [['Sxx', 'Sxy', 'Sxz'], ['Sxy', 'Syy', 'Syz'], ['Sxz', 'Syz', 'Szz']]]
+    return np.stack([np.stack(row, axis=-1) for row in s], axis=-2)
+
+
+# Интенсивность напряжений (по Мизесу)
+def von_mises(get):
+    s = stress_tensor(get)
+    if s is None:
+        return None
+    sxx, syy, szz = s[..., 0, 0], s[..., 1, 1], s[..., 2, 2]
+    sxy, sxz, syz = s[..., 0, 1], s[..., 0, 2], s[..., 1, 2]
+    return [np.sqrt(0.5*((sxx - syy)**2 + (syy - szz)**2 + (szz - sxx)**2) + 3.0*(sxy**2 + sxz**2 + syz**2))]
+
+
+# Главные напряжения (в порядке убывания)
+def principal_stresses(get):
+    s = stress_tensor(get)
+    if s is None:
+        return None
+    e = np.linalg.eigvalsh(s)
+    return [e[..., 2], e[..., 1], e[..., 0]]
+
+
+# Производные функции, вычисляемые по основным при первом обращении: (имена, функция вычисления, используемые функции)
+DerivedField = [
+    (['Usum'], displacement_magnitude, ['U', 'V', 'W']),
+    (['Seqv'], von_mises, ['Sxx', 'Syy', 'Szz', 'Sxy', 'Sxz', 'Syz']),
+    (['S1', 'S2', 'S3'], principal_stresses, ['Sxx', 'Syy', 'Szz', 'Sxy', 'Sxz', 'Syz'])
+]
+
+
+# Основные функции, по которым вычисляется производная функция (None - если такой производной функции нет)
+def derived_depends(name):
+    for names, calc, depends in DerivedField:
+        if name in names:
+            return depends
+    return None
+
+
+# Результат (значения функции в узлах) для одного момента времени
 class TResult:
-    def __init__(self):
-        self.name = ''      # Имя функции
-        self.results = []   # Узловые значения
-        self.t = 0          # Значение времени, для которого выполнен расчет
+    def __init__(self, name='', results=None, t=0):
+        self.name = name                                        # Имя функции
+        self.results = [] if results is None else results       # Узловые значения
+        self.t = t                                              # Значение времени, для которого выполнен расчет
+        self.__min__ = self.__max__ = None
 
     def min(self):
-        return min(self.results)
+        if self.__min__ is None:
+            self.__min__ = np.min(self.results)
+        return self.__min__
 
     def max(self):
-        return max(self.results)
+        if self.__max__ is None:
+            self.__max__ = np.max(self.results)
+        return self.__max__
+
+    # Сброс вычисленных min/max после изменения значений
+    def reset(self):
+        self.__min__ = self.__max__ = None
+
+
+# Хранилище результатов: массив (моменты времени x функции x узлы) с поиском по имени функции и времени.
+# Для совместимости со списком TResult допускает обход и индексацию (по времени, затем по функциям)
+class TResultStore:
+    def __init__(self, dtype=np.float64):
+        self.dtype = np.dtype(dtype)    # Тип хранимых значений (например, float32 для экономии памяти)
+        self.names = []                 # Имена функций
+        self.times = []                 # Моменты времени
+        self.__data__ = np.zeros((0, 0, 0), dtype=self.dtype)
+        self.__name_index__ = {}
+        self.__time_index__ = {}
+        self.__views__ = {}
+        self.__derived__ = dict((name, (names, calc)) for names, calc, depends in DerivedField for name in names)
+        self.__derived_data__ = {}      # Вычисленные производные функции (моменты времени x узлы)
+        self.__derived_views__ = {}
+
+    # Регистрация производной функции (или нескольких, вычисляемых вместе)
+    def register(self, names, calc):
+        for name in names:
+            self.__derived__[name] = (list(names), calc)
+        self.__reset_derived__()
+
+    # Имена доступных производных функций
+    def derived_names(self):
+        return [name for name in self.__derived__ if name not in self.__name_index__ and
+                self.__derived_field__(name) is not None]
+
+    # Добавление результатов (функции x узлы) для момента времени t
+    def add_step(self, t, names, values):
+        values = np.asarray(values)
+        if not len(self.names):
+            self.names = list(names)
+            self.__name_index__ = dict((name, i) for i, name in enumerate(self.names))
+            self.__data__ = np.zeros((1, len(self.names), values.shape[1]), dtype=self.dtype)
+        elif list(names) != self.names:
+            raise ValueError('result fields differ from the previous time steps')
+        key = self.time_key(t)
+        if key in self.__time_index__:
+            index = self.__time_index__[key]
+        else:
+            index = len(self.times)
+            if index == len(self.__data__):
+                # Увеличение емкости вдвое
+                data = np.zeros((2*len(self.__data__),) + self.__data__.shape[1:], dtype=self.dtype)
+                data[0:index] = self.__data__
+                self.__data__ = data
+                self.__views__ = {}
+            self.times.append(t)
+            self.__time_index__[key] = index
+        self.__data__[index] = values
+        self.__reset_views__(index)
+        self.__reset_derived__()
+
+    # Замена значений одной функции для момента времени t
+    def set(self, name, t, values):
+        index = self.__time_index__[self.time_key(t)]
+        self.__data__[index, self.__name_index__[name]] = values
+        view = self.__views__.get((index, self.__name_index__[name]))
+        if view is not None:
+            view.reset()
+        self.__reset_derived__()
+
+    # Поиск результата (основной или производной функции) по имени и времени (None - если не найден)
+    def find(self, name, t=0):
+        i = self.__name_index__.get(name)
+        j = self.__time_index__.get(self.time_key(t))
+        if j is None:
+            return None
+        if i is not None:
+            return self.__view__(j, i)
+        return self.__derived_view__(j, name)
+
+    # Все результаты (или функции из списка names) для момента времени t
+    def step(self, t=0, names=None):
+        j = self.__time_index__.get(self.time_key(t))
+        if j is None:
+            return []
+        if names is None:
+            return [self.__view__(j, i) for i in range(0, len(self.names))]
+        return [r for r in [self.find(name, t) for name in names] if r is not None]
+
+    # Значения всех функций в момент времени t (функции x узлы)
+    def values(self, t=0):
+        return self.__data__[self.__time_index__[self.time_key(t)]]
+
+    # Значения функции во все моменты времени (моменты времени x узлы)
+    def field(self, name):
+        if name not in self.__name_index__ and name in self.__derived__:
+            return self.__derived_field__(name)
+        return self.array()[:, self.__name_index__[name], :]
+
+    # Все результаты в виде массива (моменты времени x функции x узлы)
+    def array(self):
+        return self.__data__[0:len(self.times)]
+
+    def __len__(self):
+        return len(self.times)*len(self.names)
+
+    def __getitem__(self, k):
+        if k < 0:
+            k += len(self)
+        if k < 0 or k >= len(self):
+            raise IndexError('result index out of range')
+        return self.__view__(k//len(self.names), k % len(self.names))
+
+    def __iter__(self):
+        for k in range(0, len(self)):
+            yield self[k]
+
+    def __view__(self, j, i):
+        view = self.__views__.get((j, i))
+        if view is None:
+            view = TResult(self.names[i], self.__data__[j, i], self.times[j])
+            self.__views__[(j, i)] = view
+        return view
+
+    def __reset_views__(self, j):
+        for i in range(0, len(self.names)):
+            view = self.__views__.get((j, i))
+            if view is not None:
+                view.reset()
+
+    def __derived_view__(self, j, name):
+        view = self.__derived_views__.get((j, name))
+        if view is None:
+            values = self.__derived_field__(name)
+            if values is None:
+                return None
+            view = TResult(name, values[j], self.times[j])
+            self.__derived_views__[(j, name)] = view
+        return view
+
+    # Вычисление производной функции для всех моментов времени (None - если не хватает основных функций)
+    def __derived_field__(self, name):
+        if name in self.__derived_data__:
+            return self.__derived_data__[name]
+        if name not in self.__derived__ or not len(self.times):
+            return None
+        names, calc = self.__derived__[name]
+        values = calc(lambda n: self.array()[:, self.__name_index__[n], :] if n in self.__name_index__ else None)
+        if values is None:
+            return None
+        for n, v in zip(names, values):
+            self.__derived_data__[n] = np.asarray(v, dtype=self.dtype)
+        return self.__derived_data__[name]
+
+    # Сброс производных функций после изменения основных
+    def __reset_derived__(self):
+        self.__derived_data__ = {}
+        self.__derived_views__ = {}
 
+    # Ключ поиска по времени (устойчивый к погрешности накопления шага)
+    @staticmethod
+    def time_key(t):
+        return round(float(t), 9)
@@ -4,11 +4,13 @@
 #           Класс, реализующий расчет статической задачи
 #######################################################################
 
+import numpy as np
 from scipy.sparse import lil_matrix
 from scipy.sparse.linalg import spsolve, bicgstab, ArpackError
 from fem_fem import TFEM
+from fem_cache import TMatrixCache, matrix_key
+from fem_timer import timer
 from fem_defs import DIR_X, DIR_Y, DIR_Z
-from fem_result import TResult
 
 
 class TFEMStatic(TFEM):
@@ -27,33 +29,71 @@ class TFEMStatic(TFEM):
         fe = self.__create_fe__()
         fe.set_elasticity(self.__params__.e, self.__params__.m)
         # Вычисление компонент нагрузки
-        self.__prepare_concentrated_load__()
-        self.__prepare_surface_load__()
-        self.__prepare_volume_load__()
-        # Формирование глобальной матрицы жесткости
-        self.__progress__.set_process('Assembling global stiffness matrix...', 1, len(self.__mesh__.fe))
-        for i in range(0, len(self.__mesh__.fe)):
-            self.__progress__.set_progress(i + 1)
-            x = [0]*len(self.__mesh__.fe[i])
-            y = [0]*len(self.__mesh__.fe[i])
-            z = [0]*len(self.__mesh__.fe[i])
-            # Настройка КЭ
-            for j in range(len(self.__mesh__.fe[i])):
-                x[j], y[j], z[j] = self.__mesh__.get_coord(self.__mesh__.fe[i][j])
-            fe.set_coord(x, y, z)
-            fe.generate()
-            # Ансамблирование ЛМЖ к ГМЖ
-            self.__assembly__(fe, i)
+        with timer.phase('load'):
+            self.__prepare_concentrated_load__()
+            self.__prepare_surface_load__()
+            self.__prepare_volume_load__()
+        # Формирование глобальной матрицы жесткости (или ее загрузка из кэша)
+        with timer.phase('assembly'):
+            if not self.__load_matrices__():
+                self.__progress__.set_process('Assembling global stiffness matrix...', 1, len(self.__mesh__.fe))
+                geometry = self.__get_geometry__(fe)
+                coords = geometry.coords()
+                c = geometry.coefficients()
+                for i in range(0, len(self.__mesh__.fe)):
+                    self.__progress__.set_progress(i + 1)
+                    # Настройка КЭ
+                    x, y, z = coords[i].T.tolist()
+                    fe.set_geometry(c[i], x, y, z)
+                    fe.generate()
+                    # Ансамблирование ЛМЖ к ГМЖ
+                    self.__assembly__(fe, i)
+                self.__store_matrices__()
         # Учет краевых условий
-        self.__use_boundary_condition__()
+        with timer.phase('constraints'):
+            self.__use_boundary_condition__()
         # Решение СЛАУ
-        if not self.__solve__():
+        with timer.phase('solve'):
+            ret = self.__solve__()
+        if not ret:
             print('The system of equations is not solved!')
             return False
-        self.__calc_results__()
+        with timer.phase('results'):
+            self.__calc_results__()
+        with timer.phase('output'):
+            self.__save_step__()
         print('**************** Success! ****************')
         return True
 
+    # Глобальные матрицы, сохраняемые в кэше
+    def __cached_matrices__(self):
+        return ['__global_matrix_stiffness__']
+
+    # Загрузка глобальных матриц из кэша (False - если кэш не задан или матриц в нем нет)
+    def __load_matrices__(self):
+        if not len(self.__params__.matrix_cache):
+            return False
+        matrices = self.__matrix_cache__().get(self.__matrix_key__(), self.__cached_matrices__())
+        if matrices is None:
+            return False
+        self.__progress__.set_process('Global matrices are loaded from cache...', 1, 1)
+        for name, matrix in matrices.items():
+            setattr(self, name, matrix)
+        self.__progress__.set_progress(1)
+        return True
+
+    # Сохранение глобальных матриц в кэше (если он задан)
+    def __store_matrices__(self):
+        if len(self.__params__.matrix_cache):
+            self.__matrix_cache__().put(self.__matrix_key__(),
+                                        dict((name, getattr(self, name)) for name in self.__cached_matrices__()))
+
+    def __matrix_cache__(self):
+        return TMatrixCache(self.__params__.matrix_cache, self.__params__.matrix_cache_size*1024*1024)
+
+    def __matrix_key__(self):
+        return matrix_key(self.__mesh__, self.__params__, self.__params__.problem_type)
+
     # Добавление локальной матрицы жесткости (ЛМЖ) к ГМЖ
     def __assembly__(self, fe, index):
         # Добавление матрицы
@@ -113,6 +153,7 @@ class TFEMStatic(TFEM):
         if not counter:
             return
         self.__progress__.set_process('Computation of surface load...', 1, counter*len(self.__mesh__.surface))
+        squares = self.__mesh__.squares()
         counter = 1
         for i in range(0, len(self.__params__.bc_list)):
             if self.__params__.bc_list[i].type != 'surface':
@@ -122,7 +163,7 @@ class TFEMStatic(TFEM):
                 counter += 1
                 if not self.__check_boundary_elements__(j, self.__params__.bc_list[i].predicate):
                     continue
-                rel_se = self.__mesh__.square(j)/float(len(self.__mesh__.surface[j]))
+                rel_se = squares[j]/float(len(self.__mesh__.surface[j]))
                 for k in range(0, len(self.__mesh__.surface[j])):
                     x, y, z = self.__mesh__.get_coord(self.__mesh__.surface[j][k])
                     parser.set_variable(self.__params__.names[0], x)
@@ -148,6 +189,7 @@ class TFEMStatic(TFEM):
         if not counter:
             return
         self.__progress__.set_process('Computation of volume load...', 1, counter*len(self.__mesh__.fe))
+        volumes = self.__mesh__.volumes()
         counter = 1
         for i in range(0, len(self.__params__.bc_list)):
             if self.__params__.bc_list[i].type != 'volume':
@@ -155,7 +197,7 @@ class TFEMStatic(TFEM):
             for j in range(0, len(self.__mesh__.fe)):
                 self.__progress__.set_progress(counter)
                 counter += 1
-                rel_ve = self.__mesh__.volume(j)/float(len(self.__mesh__.fe[j]))
+                rel_ve = volumes[j]/float(len(self.__mesh__.fe[j]))
                 for k in range(0, len(self.__mesh__.fe[j])):
                     x, y, z = self.__mesh__.get_coord(self.__mesh__.fe[j][k])
                     parser.set_variable(self.__params__.names[0], x)
@@ -173,50 +215,31 @@ class TFEMStatic(TFEM):
 
     # Вычисление вспомогательных результатов (деформаций, напряжений, ...)
     def __calc_results__(self, t=0):
-        # Выделяем память для хранения результатов
-        res = []
-        for i in range(0, self.__num_result__()):
-            r = [0]*len(self.__mesh__.x)
-            res.append(r)
-        uvw = [0]*len(self.__mesh__.fe[0])*self.__mesh__.freedom
-        counter = [0]*len(self.__mesh__.x)  # Счетчик кол-ва вхождения узлов для осреднения результатов
-        # Копируем полученные перемещения
-        for i in range(0, len(self.__mesh__.x)):
-            for j in range(0, self.__mesh__.freedom):
-                res[j][i] = self.__global_load__[i*self.__mesh__.freedom + j]
-        # Вычисляем стандартные результаты по всем КЭ
-        fe = self.__create_fe__()
-        fe.set_elasticity(self.__params__.e, self.__params__.m)
-        self.__progress__.set_process('Calculation results...', 1, len(self.__mesh__.fe))
-        for i in range(0, len(self.__mesh__.fe)):
-            self.__progress__.set_progress(i + 1)
-            x = [0]*len(self.__mesh__.fe[i])
-            y = [0]*len(self.__mesh__.fe[i])
-            z = [0]*len(self.__mesh__.fe[i])
-            for j in range(len(self.__mesh__.fe[i])):
-                x[j], y[j], z[j] = self.__mesh__.get_coord(self.__mesh__.fe[i][j])
-            fe.set_coord(x, y, z)
-            for j in range(0, len(self.__mesh__.fe[i])):
-                for k in range(0, self.__mesh__.freedom):
-                    uvw[j*self.__mesh__.freedom + k] = \
-                        self.__global_load__[self.__mesh__.freedom*self.__mesh__.fe[i][j] + k]
-            r = fe.calc(uvw)
-            for m in range(0, len(r)):
-                for j in range(0, len(r[0])):
-                    res[self.__mesh__.freedom + m][self.__mesh__.fe[i][j]] += r[m][j]
-                    if not m:
-                        counter[self.__mesh__.fe[i][j]] += 1
-        # Осредняем результаты
-        for i in range(self.__mesh__.freedom, self.__num_result__()):
-            for j in range(0, len(self.__mesh__.x)):
-                res[i][j] /= counter[j]
-        # Сохраняем полученные результаты в списке
-        for i in range(0, self.__num_result__()):
-            r = TResult()
-            r.name = self.__params__.names[self.__index_result__(i)]
-            r.results = res[i]
-            r.t = t
-            self.__result__.append(r)
+        freedom = self.__mesh__.freedom
+        n = len(self.__mesh__.x)
+        fe_array = self.__mesh__.fe_array()
+        selected = self.__selected_results__()
+        # Выделяем память только для запрошенных результатов и копируем полученные перемещения
+        res = np.zeros((len(selected), n))
+        uvw = np.asarray(self.__global_load__, dtype=float).reshape(n, freedom)
+        for k, i in enumerate(selected):
+            if i < freedom:
+                res[k] = uvw[:, i]
+        self.__progress__.set_process('Calculation results...', 1, 1)
+        # Вычисляем деформации и напряжения сразу по всем КЭ (если запрошена хотя бы одна их компонента)
+        if any(i >= freedom for i in selected):
+            fe = self.__create_fe__()
+            fe.set_elasticity(self.__params__.e, self.__params__.m)
+            geometry = self.__get_geometry__(fe)
+            r = fe.calc_all(geometry.coords(), uvw[fe_array], geometry.gradients())
+            # Осредняем результаты (по кол-ву КЭ, содержащих узел)
+            counter = np.maximum(self.__mesh__.node_valence(), 1)
+            for k, i in enumerate(selected):
+                if freedom <= i < freedom + len(r):
+                    res[k] = np.bincount(fe_array.ravel(), weights=r[i - freedom].ravel(), minlength=n)/counter
+        self.__progress__.set_progress(1)
+        # Сохраняем полученные результаты
+        self.__result__.add_step(t, self.__result_names__(), res)
 
     # Задание граничных условий
     def __set_boundary_condition__(self, i, j, val):
@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#      Табличный текстовый вывод (и чтение) результатов расчета
+###################################################################
+
+import json
+import mmap
+import os
+import re
+import numpy as np
+from fem_file import Compression
+from fem_result import TResultStore
+
+# Расширение файла индекса текстовых результатов
+IndexExt = '.idx'
+
+# Заголовок таблицы (с предшествующей строкой времени в случае динамической задачи)
+TableHeader = re.compile(rb'(?:^t = *([-+0-9.Ee]+)\r?\n)?^(\| +N +\(.*)$', re.M)
+
+# Символы-разделители в строках таблицы
+TableDelimiters = b'|(),'
+
+
+# Форматирование таблицы результатов блоками строк с записью в файл крупными фрагментами
+class TTextWriter:
+    def __init__(self, mesh, params):
+        self.mesh = mesh                # Сетка
+        self.params = params            # Параметры расчета (имена функций, ширина и точность вывода)
+        self.block_size = 10000         # Кол-во строк таблицы, формируемых за один раз
+
+    # Вывод результатов для одного момента времени
+    def write(self, file, results):
+        len1 = len(self.__number__() % 3.14159)
+        len2 = len('%d' % len(self.mesh.x))
+        file.write(self.__header__(results, len1, len2))
+        # Узлы выводятся в исходной (до перенумерации) нумерации
+        order = np.array(self.mesh.original_order(), dtype=int)
+        coord = [self.mesh.x, self.mesh.y, self.mesh.z][0:self.__coord_count__()]
+        coord = [np.asarray(c, dtype=float) for c in coord]
+        values = [np.asarray(r.results) for r in results]
+        for start in range(0, len(order), self.block_size):
+            index = order[start:start + self.block_size]
+            file.write(self.__rows__(start, index, coord, values, len2))
+        file.write('\n')
+        file.write(self.__footer__(results, len1, len2))
+
+    # Кол-во выводимых координат (по наличию y и z)
+    def __coord_count__(self):
+        return 1 + (len(self.mesh.y) > 0) + (len(self.mesh.z) > 0)
+
+    # Формат вывода числа
+    def __number__(self):
+        return '%%+%d.%dE' % (self.params.width, self.params.precision)
+
+    # Строки таблицы для узлов с номерами start + 1, ... (index - номера узлов в текущей нумерации).
+    # Формат строки повторяется для всего блока и применяется к нему одной операцией
+    def __rows__(self, start, index, coord, values, len2):
+        number = self.__number__()
+        row = '| %%%dd  ( ' % len2 + ', '.join([number]*len(coord)) + ') | ' + \
+              ''.join([number + ' | ']*len(values)) + '\n'
+        table = np.column_stack([np.arange(start + 1, start + len(index) + 1)] + [c[index] for c in coord] +
+                                [v[index] for v in values])
+        return (row*len(index)) % tuple(table.ravel().tolist())
+
+    # Заголовок таблицы
+    def __header__(self, results, len1, len2):
+        freedom = self.mesh.freedom
+        text = '| %*s  (' % (len2, 'N')
+        text += ','.join(' %*s' % (len1, self.params.names[i]) for i in range(0, freedom))
+        text += ') |'
+        text += ''.join(' %*s |' % (len1, r.name) for r in results)
+        return text + '\n'
+
+    # Итоговые строки (минимальные и максимальные значения функций)
+    def __footer__(self, results, len1, len2):
+        freedom = self.mesh.freedom
+        number = self.__number__()
+        text = '|  %*s  ' % (len2, ' ')
+        text += ' '.join(' %*s' % (len1, ' ') for i in range(0, freedom))
+        text += '  |'
+        text += ''.join(' %*s |' % (len1, r.name) for r in results)
+        text += '\n'
+        width = freedom*(len1 + 1) + freedom + len2
+        text += '|   %*s  |' % (width, 'min:') + ''.join(' ' + number % r.min() + ' |' for r in results) + '\n'
+        text += '|   %*s  |' % (width, 'max:') + ''.join(' ' + number % r.max() + ' |' for r in results) + '\n'
+        return text + '\n\n'
+
+
+# Чтение текстовых файлов результатов (формат print_result) с индексом смещений таблиц в файле.
+# Индекс сохраняется рядом с файлом (name.idx), поэтому отдельный момент времени или функция
+# загружаются без повторного просмотра всего файла
+class TTextReader:
+    def __init__(self, name):
+        self.name = name            # Имя файла результатов
+        self.names = []             # Имена функций
+        self.coords = 0             # Кол-во координат узла
+        self.blocks = []            # Таблицы: [t, начало и конец строк узлов в файле]
+        self.dynamic = False        # Признак наличия моментов времени (динамическая задача)
+        self.__data__ = None        # Содержимое сжатого файла (несжатый файл читается по смещениям)
+        self.__time_index__ = {}
+        if os.path.splitext(name)[1].lower() in Compression:
+            with Compression[os.path.splitext(name)[1].lower()](name, 'rb') as file:
+                self.__data__ = file.read()
+            self.__build_index__(self.__data__)
+        elif not self.__load_index__():
+            with open(name, 'rb') as file:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(name) else b''
+                self.__build_index__(data)
+            self.__save_index__()
+        self.__time_index__ = dict((TResultStore.time_key(b[0]), i) for i, b in enumerate(self.blocks))
+
+    # Моменты времени, для которых записаны результаты
+    def times(self):
+        return [b[0] for b in self.blocks]
+
+    # Все функции для момента времени t (функции x узлы, в нумерации файла)
+    def step(self, t=0):
+        return self.__table__(self.__time_index__[TResultStore.time_key(t)])[:, 1 + self.coords:].T
+
+    # Значения функции в момент времени t
+    def get(self, name, t=0):
+        return self.step(t)[self.names.index(name)]
+
+    # Значения функции во все моменты времени (моменты времени x узлы)
+    def field(self, name):
+        k = 1 + self.coords + self.names.index(name)
+        return np.array([self.__table__(i)[:, k] for i in range(0, len(self.blocks))])
+
+    # Координаты узлов (узлы x координаты)
+    def coord(self):
+        return self.__table__(0)[:, 1:1 + self.coords]
+
+    # Загрузка (всех или части) моментов времени в хранилище результатов
+    def to_store(self, times=None, dtype=np.float64):
+        store = TResultStore(dtype)
+        for t in (self.times() if times is None else times):
+            store.add_step(t, self.names, self.step(t))
+        return store
+
+    # Поиск таблиц в файле
+    def __build_index__(self, data):
+        self.blocks = []
+        self.dynamic = False
+        for match in TableHeader.finditer(data):
+            if not len(self.blocks):
+                self.__parse_header__(match.group(2))
+            start = data.find(b'\n', match.end(2)) + 1
+            end = data.find(b'\n\n', start - 1) + 1
+            if start == 0 or end == 0:
+                raise ValueError('incomplete result table in %s' % self.name)
+            if match.group(1) is not None:
+                self.dynamic = True
+            t = float(match.group(1)) if match.group(1) is not None else 0.0
+            self.blocks.append([t, start, end])
+
+    # Имена координат и функций из заголовка таблицы
+    def __parse_header__(self, line):
+        line = line.decode()
+        left, right = line[line.index('(') + 1:line.index(')')], line[line.index(')') + 1:]
+        self.coords = len(left.split(','))
+        self.names = [n.strip() for n in right.split('|') if len(n.strip())]
+
+    # Разбор таблицы с номером i (узлы x (номер, координаты, функции))
+    def __table__(self, i):
+        t, start, end = self.blocks[i]
+        if self.__data__ is not None:
+            text = self.__data__[start:end]
+        else:
+            with open(self.name, 'rb') as file:
+                file.seek(start)
+                text = file.read(end - start)
+        values = np.array(text.translate(None, TableDelimiters).split(), dtype=float)
+        return values.reshape(-1, 1 + self.coords + len(self.names))
+
+    # Чтение индекса (если он соответствует файлу результатов)
+    def __load_index__(self):
+        try:
+            with open(self.name + IndexExt) as file:
+                index = json.load(file)
+            stat = os.stat(self.name)
+            if index['size'] != stat.st_size or index['mtime'] != stat.st_mtime:
+                return False
+            self.names, self.coords, self.blocks, self.dynamic = \
+                index['names'], index['coords'], index['blocks'], index['dynamic']
+        except (IOError, ValueError, KeyError):
+            return False
+        return True
+
+    # Сохранение индекса (невозможность записи не является ошибкой)
+    def __save_index__(self):
+        stat = os.stat(self.name)
+        index = {'size': stat.st_size, 'mtime': stat.st_mtime, 'names': self.names, 'coords': self.coords,
+                 'blocks': self.blocks, 'dynamic': self.dynamic}
+        try:
+            with open(self.name + IndexExt, 'w') as file:
+                json.dump(index, file)
+        except IOError:
+            pass
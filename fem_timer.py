@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#              Измерение времени выполнения фаз расчета
+###################################################################
+
+from contextlib import contextmanager
+from time import perf_counter
+
+# Фазы расчета
+Phase = [
+    'mesh',         # загрузка и проверка сетки
+    'load',         # вычисление нагрузок (и начальных условий)
+    'assembly',     # формирование глобальных матриц
+    'constraints',  # учет краевых условий
+    'solve',        # решение СЛАУ
+    'results',      # вычисление деформаций, напряжений, скоростей, ...
+    'output'        # вывод результатов
+]
+
+
+# Суммарное время и кол-во выполнений каждой фазы
+class TTimer:
+    def __init__(self):
+        self.total = {}     # Суммарное время выполнения фаз (с)
+        self.count = {}     # Кол-во выполнений фаз
+        self.profiler = None    # Профилировщик фаз (TProfiler), None - без профилирования
+
+    # Сброс накопленных значений
+    def reset(self):
+        self.total = {}
+        self.count = {}
+
+    # Измерение времени выполнения фазы (вложенные фазы учитываются и в объемлющей)
+    @contextmanager
+    def phase(self, name):
+        start = perf_counter()
+        try:
+            if self.profiler is None:
+                yield
+            else:
+                with self.profiler.phase(name):
+                    yield
+        finally:
+            self.total[name] = self.total.get(name, 0.0) + perf_counter() - start
+            self.count[name] = self.count.get(name, 0) + 1
+
+    # Накопленные значения в порядке фаз расчета
+    def report(self):
+        names = [name for name in Phase if name in self.total] + \
+                sorted(name for name in self.total if name not in Phase)
+        return dict((name, {'time': self.total[name], 'count': self.count[name]}) for name in names)
+
+
+# Общий для всех объектов расчета измеритель времени
+timer = TTimer()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#   Экспорт сетки и результатов в формат VTK (.vtu, серии .pvd)
+###################################################################
+
+import base64
+import os
+import numpy as np
+from fem_error import TFEMException
+
+# Коды типов ячеек VTK для типов КЭ (порядок узлов КЭ совпадает с принятым в VTK)
+VTKCellType = {
+    'fe_1d_2': 3,       # VTK_LINE
+    'fe_2d_3': 5,       # VTK_TRIANGLE
+    'fe_2d_4': 9,       # VTK_QUAD
+    'fe_3d_4': 10,      # VTK_TETRA
+    'fe_3d_8': 12       # VTK_HEXAHEDRON
+}
+
+# Способы записи двоичных данных в раздел AppendedData
+VTKEncoding = ['raw', 'base64']
+
+
+# Запись сетки и результатов в файлы VTK (UnstructuredGrid)
+class TVTKWriter:
+    def __init__(self, mesh, names, encoding='raw'):
+        if encoding not in VTKEncoding:
+            raise TFEMException('vtk_encoding_err')
+        self.mesh = mesh                # Сетка
+        self.names = names              # Имена аргументов и функций (перемещения - начиная с names[4])
+        self.encoding = encoding        # Способ кодирования двоичных данных
+
+    # Запись результатов для всех моментов времени: name.vtu (один момент) или name_NNNN.vtu и name.pvd
+    def write(self, name, results):
+        name = os.path.splitext(name)[0]
+        if len(results.times) < 2:
+            self.write_step(name + '.vtu', results.step(results.times[0] if len(results.times) else 0))
+            return
+        files = []
+        for i, t in enumerate(results.times):
+            file_name = '%s_%04d.vtu' % (name, i)
+            self.write_step(file_name, results.step(t))
+            files.append((t, os.path.basename(file_name)))
+        self.write_collection(name + '.pvd', files)
+
+    # Запись одного момента времени в файл .vtu
+    def write_step(self, name, results):
+        fe = self.mesh.fe_array()
+        arrays = [('Points', self.__points__()),
+                  ('connectivity', fe.astype(np.int64).ravel()),
+                  ('offsets', np.arange(1, len(fe) + 1, dtype=np.int64)*fe.shape[1]),
+                  ('types', np.full(len(fe), VTKCellType[self.mesh.fe_type], dtype=np.uint8))]
+        displacement = self.__displacement__(results)
+        if displacement is not None:
+            arrays.append(('Displacement', displacement))
+        for r in results:
+            arrays.append((r.name, np.asarray(r.results)))
+        # Разметка XML со смещениями массивов в разделе AppendedData
+        blocks = [self.__encode__(data) for _, data in arrays]
+        offsets = np.concatenate([[0], np.cumsum([len(b) for b in blocks])])
+        tags = [self.__tag__(array_name, data, offsets[i]) for i, (array_name, data) in enumerate(arrays)]
+        try:
+            with open(name, 'wb') as file:
+                file.write(b'<?xml version="1.0"?>\n')
+                file.write(b'<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" '
+                           b'header_type="UInt64">\n')
+                file.write(b'  <UnstructuredGrid>\n')
+                file.write(('    <Piece NumberOfPoints="%d" NumberOfCells="%d">\n' %
+                            (len(self.mesh.x), len(fe))).encode())
+                file.write(b'      <Points>\n' + tags[0] + b'      </Points>\n')
+                file.write(b'      <Cells>\n' + b''.join(tags[1:4]) + b'      </Cells>\n')
+                file.write(b'      <PointData>\n' + b''.join(tags[4:]) + b'      </PointData>\n')
+                file.write(b'    </Piece>\n')
+                file.write(b'  </UnstructuredGrid>\n')
+                file.write(('  <AppendedData encoding="%s">\n   _' % self.encoding).encode())
+                for block in blocks:
+                    file.write(block)
+                file.write(b'\n  </AppendedData>\n')
+                file.write(b'</VTKFile>\n')
+        except IOError:
+            raise TFEMException('write_file_err')
+
+    # Запись индекса серии файлов по времени (.pvd)
+    @staticmethod
+    def write_collection(name, files):
+        try:
+            with open(name, 'w') as file:
+                file.write('<?xml version="1.0"?>\n')
+                file.write('<VTKFile type="Collection" version="1.0" byte_order="LittleEndian">\n')
+                file.write('  <Collection>\n')
+                for t, file_name in files:
+                    file.write('    <DataSet timestep="%.17g" part="0" file="%s"/>\n' % (t, file_name))
+                file.write('  </Collection>\n')
+                file.write('</VTKFile>\n')
+        except IOError:
+            raise TFEMException('write_file_err')
+
+    # Координаты узлов (узел x 3)
+    def __points__(self):
+        points = np.zeros((len(self.mesh.x), 3))
+        points[:, 0] = self.mesh.x
+        if len(self.mesh.y):
+            points[:, 1] = self.mesh.y
+        if len(self.mesh.z):
+            points[:, 2] = self.mesh.z
+        return points
+
+    # Вектор перемещений (узел x 3), если все его компоненты есть среди результатов
+    def __displacement__(self, results):
+        values = dict((r.name, r.results) for r in results)
+        names = self.names[4:4 + self.mesh.freedom]
+        if not len(names) or any(n not in values for n in names):
+            return None
+        res = np.zeros((len(self.mesh.x), 3))
+        for i, n in enumerate(names):
+            res[:, i] = values[n]
+        return res
+
+    # Двоичный блок: размер данных (UInt64) и сами данные
+    def __encode__(self, data):
+        data = np.ascontiguousarray(data).tobytes()
+        header = np.uint64(len(data)).tobytes()
+        if self.encoding == 'raw':
+            return header + data
+        return base64.b64encode(header) + base64.b64encode(data)
+
+    # Описание массива в разметке XML
+    @staticmethod
+    def __tag__(name, data, offset):
+        components = data.shape[1] if data.ndim > 1 else 1
+        data_type = {'f': 'Float', 'i': 'Int', 'u': 'UInt'}[data.dtype.kind] + str(8*data.dtype.itemsize)
+        return ('        <DataArray type="%s" Name="%s" NumberOfComponents="%d" format="appended" offset="%d"/>\n' %
+                (data_type, name, components, offset)).encode()
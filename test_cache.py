@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#              Проверка дискового кэша глобальных матриц
+###################################################################
+
+import glob
+import os
+import numpy as np
+from fem_cache import CacheExt
+from fem_defs import DIR_X, DIR_Y, DIR_Z
+from fem_generator import generate_mesh
+from fem_object import TObject
+from fem_progress import TProgress, TCallbackSink
+
+# Процессы расчета при формировании ГМЖ и при ее загрузке из кэша
+Assembling = 'Assembling global stiffness matrix...'
+Loaded = 'Global matrices are loaded from cache...'
+
+
+# Статический расчет куба с кэшем матриц в каталоге <path>/cache; возвращает результаты и список процессов расчета
+def solve_cached(path):
+    name = os.path.join(str(path), 'cube.trpa')
+    if not os.path.exists(name):
+        generate_mesh('fe_3d_4', 3).save(name)
+    processes = []
+    obj = TObject()
+    obj.set_progress(TProgress([TCallbackSink(lambda e: processes.append(e['process']) if e['event'] == 'start'
+                                              else None)]))
+    assert obj.set_mesh(name)
+    obj.set_problem_type('static')
+    obj.set_solve_method('direct')
+    obj.set_elasticity([203200], [0.27])
+    obj.add_boundary_condition('0', 'z=0', DIR_X | DIR_Y | DIR_Z)
+    obj.add_surface_load('-1000', 'z=1', DIR_Z)
+    obj.set_matrix_cache(os.path.join(str(path), 'cache'))
+    assert obj.calc()
+    return obj.__results__.array().copy(), processes
+
+
+# Файлы кэша
+def cache_files(path):
+    return glob.glob(os.path.join(str(path), 'cache', '*' + CacheExt))
+
+
+def test_cache_hit(tmp_path):
+    res1, processes = solve_cached(tmp_path)
+    assert Assembling in processes and Loaded not in processes
+    assert len(cache_files(tmp_path)) == 1
+    res2, processes = solve_cached(tmp_path)
+    assert Loaded in processes and Assembling not in processes
+    assert np.array_equal(res1, res2)
+
+
+def test_cache_truncated(tmp_path):
+    res1, _ = solve_cached(tmp_path)
+    name = cache_files(tmp_path)[0]
+    with open(name, 'r+b') as file:
+        file.truncate(os.path.getsize(name)//2)
+    res2, processes = solve_cached(tmp_path)
+    assert Assembling in processes and Loaded not in processes
+    assert np.array_equal(res1, res2)
+    # Поврежденный файл заменен новым
+    res3, processes = solve_cached(tmp_path)
+    assert Loaded in processes
+    assert np.array_equal(res1, res3)
+
+
+def test_cache_damaged(tmp_path):
+    res1, _ = solve_cached(tmp_path)
+    name = cache_files(tmp_path)[0]
+    # Изменение значений матрицы без пересчета контрольной суммы
+    with np.load(name) as file:
+        arrays = dict((k, file[k]) for k in file.files)
+    arrays['__global_matrix_stiffness___data'] = arrays['__global_matrix_stiffness___data']*2
+    with open(name, 'wb') as file:
+        np.savez(file, **arrays)
+    res2, processes = solve_cached(tmp_path)
+    assert Assembling in processes and Loaded not in processes
+    assert np.array_equal(res1, res2)
+    res3, processes = solve_cached(tmp_path)
+    assert Loaded in processes
+    assert np.array_equal(res1, res3)
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#     Проверка продолжения динамического расчета с контрольной точки
+###################################################################
+
+import os
+import numpy as np
+from fem_defs import DIR_X, DIR_Y
+from fem_generator import generate_mesh
+from fem_object import TObject
+from fem_progress import TProgress
+
+
+# Динамический расчет пластины до момента времени t1 (checkpoint - (файл, интервал, продолжение) или None)
+def dynamic_object(path, t1, checkpoint=None, load='-1.0E+3*cos(t)'):
+    name = os.path.join(str(path), 'plate.trpa')
+    if not os.path.exists(name):
+        generate_mesh('fe_2d_3', 4).save(name)
+    obj = TObject()
+    obj.set_progress(TProgress([]))
+    assert obj.set_mesh(name)
+    obj.set_problem_type('dynamic')
+    obj.set_solve_method('direct')
+    obj.set_elasticity([203200], [0.27])
+    obj.set_density(1.0E+3)
+    obj.set_damping(1.0E-2)
+    obj.set_time(0, t1, 0.125)
+    obj.add_boundary_condition('0', 'y=0', DIR_X | DIR_Y)
+    obj.add_surface_load(load, 'y=1', DIR_Y)
+    if checkpoint is not None:
+        obj.set_checkpoint(*checkpoint)
+    return obj
+
+
+def test_restart(tmp_path):
+    full = dynamic_object(tmp_path, 1.0)
+    assert full.calc()
+    name = os.path.join(str(tmp_path), 'plate.ckpt')
+    first = dynamic_object(tmp_path, 0.5, (name, 1, False))
+    assert first.calc()
+    assert os.path.exists(name)
+    second = dynamic_object(tmp_path, 1.0, (name, 1, True))
+    assert second.calc()
+    assert second.__results__.times == full.__results__.times
+    assert np.array_equal(second.__results__.array(), full.__results__.array())
+
+
+def test_restart_other_load(tmp_path):
+    name = os.path.join(str(tmp_path), 'plate.ckpt')
+    assert dynamic_object(tmp_path, 0.5, (name, 1, False)).calc()
+    assert not dynamic_object(tmp_path, 1.0, (name, 1, True), '-2.0E+3*cos(t)').calc()
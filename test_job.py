@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#           Проверка выполнения заданий (fem_job.py)
+###################################################################
+
+import json
+import os
+from fem_generator import generate_mesh
+from fem_job import run_jobs
+
+
+# Задание для плоской треугольной сетки с построением изображения
+def write_job(path):
+    generate_mesh('fe_2d_3', 4).save(os.path.join(str(path), 'plate.trpa'))
+    job = {
+        'mesh': 'plate.trpa',
+        'problem_type': 'static',
+        'solve_method': 'direct',
+        'elasticity': {'e': [203200], 'm': [0.27]},
+        'boundary_conditions': [{'value': '0', 'predicate': 'y=0', 'direction': 'xy'}],
+        'surface_loads': [{'value': '-1000', 'predicate': 'y=1', 'direction': 'y'}],
+        'output': {'result': 'plate.res', 'plots': [{'function': 'V', 'file': 'plate_v.png'}]}
+    }
+    name = os.path.join(str(path), 'plate.json')
+    with open(name, 'w') as file:
+        json.dump(job, file)
+    return name
+
+
+def test_job_plot_2d(tmp_path):
+    name = write_job(tmp_path)
+    res = run_jobs([name], [str(tmp_path)])
+    assert res[0]['status'] == 'ok', res[0].get('error')
+    assert os.path.getsize(os.path.join(str(tmp_path), 'plate_v.png')) > 0
+    assert os.path.getsize(os.path.join(str(tmp_path), 'plate.res')) > 0
+    with open(os.path.join(str(tmp_path), 'plate.report.json')) as file:
+        assert json.load(file)['status'] == 'ok'
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#          Проверка построения границы сетки при загрузке
+###################################################################
+
+import os
+import pytest
+from fem_generator import generate_mesh
+from fem_mesh import TMesh
+
+
+# Загрузка сетки, в файле которой задана только часть граничных элементов (keep - кол-во)
+def load_partial(path, fe_type, keep):
+    mesh = generate_mesh(fe_type, 3)
+    surface = mesh.surface
+    mesh.surface = surface[0:keep]
+    name = os.path.join(str(path), fe_type + '.trpa')
+    mesh.save(name)
+    res = TMesh()
+    res.load(name)
+    return surface, res
+
+
+@pytest.mark.parametrize('fe_type', ['fe_2d_3', 'fe_2d_4', 'fe_3d_4', 'fe_3d_8'])
+def test_surface_partial(tmp_path, fe_type):
+    surface, mesh = load_partial(tmp_path, fe_type, 5)
+    assert mesh.surface_added == len(surface) - 5
+    assert sorted(mesh.surface) == sorted(surface)
+    # Заданные в файле ГЭ сохраняются на своих местах
+    assert mesh.surface[0:5] == surface[0:5]
+
+
+def test_surface_empty(tmp_path):
+    surface, mesh = load_partial(tmp_path, 'fe_3d_8', 0)
+    assert mesh.surface_added == len(surface)
+    assert sorted(mesh.surface) == sorted(surface)
+
+
+def test_surface_complete(tmp_path):
+    surface, mesh = load_partial(tmp_path, 'fe_3d_8', None)
+    assert mesh.surface_added == 0
+    assert mesh.surface == surface
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#         Проверка записи событий прогресса расчета в файл
+###################################################################
+
+import json
+import os
+from fem_defs import DIR_X, DIR_Y
+from fem_generator import generate_mesh
+from fem_object import TObject
+from fem_progress import TProgress, TJSONSink
+
+
+# Статический расчет пластины с записью событий прогресса в JSON-файл
+def solve(path, sink):
+    name = os.path.join(str(path), 'plate.trpa')
+    generate_mesh('fe_2d_3', 3).save(name)
+    obj = TObject()
+    obj.set_progress(TProgress([sink]))
+    assert obj.set_mesh(name)
+    obj.set_problem_type('static')
+    obj.set_solve_method('direct')
+    obj.set_elasticity([203200], [0.27])
+    obj.add_boundary_condition('0', 'y=0', DIR_X | DIR_Y)
+    obj.add_surface_load('-1000', 'y=1', DIR_Y)
+    assert obj.calc()
+    return obj
+
+
+# События из файла
+def read_events(name):
+    with open(name) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_json_sink(tmp_path):
+    name = os.path.join(str(tmp_path), 'progress.json')
+    sink = TJSONSink(name)
+    obj = solve(tmp_path, sink)
+    # По окончании расчета файл закрыт, последнее событие - окончание последнего процесса
+    assert sink.file is None
+    events = read_events(name)
+    assert events[-1]['event'] == 'stop'
+    assert sum(e['event'] == 'start' for e in events) == sum(e['event'] == 'stop' for e in events)
+    # Повторный расчет дописывает события в тот же файл
+    assert obj.calc()
+    assert sink.file is None
+    assert len(read_events(name)) == 2*len(events)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#       Проверка пакетного построения изображений (без экрана)
+###################################################################
+
+import os
+import pytest
+import fem_object
+from fem_defs import DIR_X, DIR_Y, DIR_Z
+from fem_generator import generate_mesh
+from fem_object import TObject
+from fem_progress import TProgress
+
+
+# Расчет квадрата (куба) из КЭ заданного типа (закреплен по y = 0 (z = 0), нагружен по y = 1 (z = 1))
+def solve_object(path, fe_type):
+    name = os.path.join(str(path), fe_type + '.trpa')
+    generate_mesh(fe_type, 3).save(name)
+    obj = TObject()
+    obj.set_progress(TProgress([]))
+    assert obj.set_mesh(name)
+    obj.set_problem_type('static')
+    obj.set_solve_method('direct')
+    obj.set_elasticity([203200], [0.27])
+    if fe_type.startswith('fe_3d'):
+        obj.add_boundary_condition('0', 'z=0', DIR_X | DIR_Y | DIR_Z)
+        obj.add_surface_load('-1000', 'z=1', DIR_Z)
+    else:
+        obj.add_boundary_condition('0', 'y=0', DIR_X | DIR_Y)
+        obj.add_surface_load('-1000', 'y=1', DIR_Y)
+    assert obj.calc()
+    return obj
+
+
+@pytest.mark.parametrize('fe_type, fun_name', [('fe_2d_3', 'V'), ('fe_2d_4', 'V'), ('fe_3d_8', 'W')])
+def test_render(tmp_path, fe_type, fun_name):
+    obj = solve_object(tmp_path, fe_type)
+    plots = [(fun_name, 0, os.path.join(str(tmp_path), 'u.png')), ('Sxx', 0, os.path.join(str(tmp_path), 's.png'))]
+    assert obj.render(plots, 2)
+    for _, _, name in plots:
+        assert os.path.getsize(name) > 0
+
+
+def test_save_plot_2d(tmp_path):
+    obj = solve_object(tmp_path, 'fe_2d_4')
+    name = os.path.join(str(tmp_path), 'v.png')
+    assert obj.save_plot('V', name)
+    assert os.path.getsize(name) > 0
+
+
+def test_render_error(tmp_path):
+    obj = solve_object(tmp_path, 'fe_2d_3')
+    assert not obj.render([('V', 0, os.path.join(str(tmp_path), 'missing', 'v.png'))], 1)
+
+
+def test_plot_headless(tmp_path):
+    obj = solve_object(tmp_path, 'fe_2d_3')
+    fem_object.import_plot()
+    fem_object.plt.switch_backend('Agg')
+    obj.plot('V')
+    fem_object.plt.close('all')
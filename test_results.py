@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#   Проверка вычисления деформаций и напряжений (сразу по всем КЭ)
+###################################################################
+
+import numpy as np
+import pytest
+from fem_defs import DIR_X, DIR_Y, DIR_Z
+from fem_generator import generate_mesh
+from fem_params import TFEMParams
+from fem_progress import TProgress
+from fem_static import TFEMStatic
+
+
+# Статический расчет сгенерированной сетки (закреплена по x = 0, нагружена по x = 1)
+def solve(fe_type):
+    mesh = generate_mesh(fe_type, 3)
+    params = TFEMParams()
+    params.problem_type = 'static'
+    params.solve_method = 'direct'
+    params.e = [203200]
+    params.m = [0.27]
+    direction = [DIR_X, DIR_X | DIR_Y, DIR_X | DIR_Y | DIR_Z][mesh.freedom - 1]
+    params.add_boundary_condition('0', 'x=0', direction)
+    params.add_surface_load('-1000', 'x=1', DIR_Y if mesh.freedom > 1 else DIR_X)
+    params.add_volume_load('100', '', DIR_X)
+    fem = TFEMStatic()
+    fem.set_mesh(mesh)
+    fem.set_params(params)
+    fem.set_progress(TProgress([]))
+    assert fem.calc()
+    return fem
+
+
+# Осреднение результатов по узлам с вычислением по каждому КЭ в отдельности
+def reference(fem, u):
+    mesh = fem.__mesh__
+    freedom = mesh.freedom
+    res = np.zeros((fem.__num_result__(), len(mesh.x)))
+    counter = np.zeros(len(mesh.x))
+    fe = fem.__create_fe__()
+    fe.set_elasticity(fem.__params__.e, fem.__params__.m)
+    for i in range(0, len(mesh.fe)):
+        fe.set_coord(*[[mesh.get_coord(j)[k] for j in mesh.fe[i]] for k in range(0, 3)])
+        r = fe.calc([u[j*freedom + k] for j in mesh.fe[i] for k in range(0, freedom)])
+        for m in range(0, len(r)):
+            for j in range(0, len(mesh.fe[i])):
+                res[freedom + m][mesh.fe[i][j]] += r[m][j]
+        for j in mesh.fe[i]:
+            counter[j] += 1
+    return res[freedom:]/counter
+
+
+@pytest.mark.parametrize('fe_type', ['fe_1d_2', 'fe_2d_3', 'fe_2d_4', 'fe_3d_4', 'fe_3d_8'])
+def test_calc_results(fe_type):
+    fem = solve(fe_type)
+    result = fem.get_result()
+    freedom = fem.__mesh__.freedom
+    u = np.array([result.find(fem.__params__.names[fem.__index_result__(k)]).results for k in range(0, freedom)])
+    expected = reference(fem, u.T.ravel())
+    for m in range(0, len(expected)):
+        name = fem.__params__.names[fem.__index_result__(freedom + m)]
+        actual = np.asarray(result.find(name).results)
+        assert np.allclose(actual, expected[m], rtol=1e-9, atol=1e-9*abs(expected[m]).max()), name
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+###################################################################
+#      Проверка времени запуска (импорт без визуализации)
+###################################################################
+
+from fem_bench import StartupBudget, startup_time
+
+
+# Импорт fem_object в новом процессе не загружает matplotlib и укладывается в допустимое время
+def test_startup():
+    elapsed, modules = startup_time()
+    assert modules == []
+    assert elapsed <= StartupBudget